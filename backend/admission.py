@@ -0,0 +1,165 @@
+"""
+Admission control: per-client rate limits and per-class concurrency budgets.
+
+Clients are keyed by the `user_id` query/path param when the endpoint has one,
+otherwise by IP. `user_id` is set by the client (there is no auth token yet),
+so per-user limits only slow down well-behaved clients: anyone can dodge them
+by sending a different user_id. The concurrency budgets and the per-IP limits
+on login/signup are what actually protect the server.
+
+Behind a reverse proxy (Render) every request arrives from the proxy's
+address, so set TRUSTED_PROXY_HOPS to the number of proxies that append to
+X-Forwarded-For, otherwise all anonymous clients share one bucket. Leave it at
+0 when the app is reachable directly, since clients can forge the header.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import anyio
+from fastapi import HTTPException, Request
+
+# --- Cost Classes ---
+# Every endpoint belongs to one class. Each class has:
+# - a per-user token bucket (rate = tokens/second, burst = bucket size)
+# - a concurrency budget shared by everyone (max_concurrent)
+# - queue_timeout: how long a request may wait for a free slot. This is the
+#   priority: cheap reads wait a little, expensive low-priority work (LLM
+#   generation) is shed immediately with 503 instead of piling up.
+# Waiting happens on the event loop, not in a worker thread. The budgets add up
+# to less than the 40 threads of the default threadpool, so an admitted sync
+# endpoint never queues behind other requests for a thread.
+@dataclass
+class CostClass:
+    rate: float
+    burst: int
+    max_concurrent: int
+    queue_timeout: float
+
+CPU_COUNT = os.cpu_count() or 2
+
+COST_CLASSES = {
+    "llm": CostClass(rate=5 / 60, burst=3, max_concurrent=4, queue_timeout=0.0),
+    "hashing": CostClass(rate=1.0, burst=5, max_concurrent=min(CPU_COUNT, 8), queue_timeout=0.5),
+    "write": CostClass(rate=10.0, burst=20, max_concurrent=8, queue_timeout=1.0),
+    "read": CostClass(rate=20.0, burst=40, max_concurrent=16, queue_timeout=2.0),
+    "export": CostClass(rate=1 / 60, burst=2, max_concurrent=2, queue_timeout=0.0),
+}
+
+# How many (user, class) buckets to keep before dropping the least recently used
+MAX_TRACKED_BUCKETS = 50_000
+
+# Reverse proxies in front of the app that append to X-Forwarded-For (see above)
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+class TokenBucket:
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def try_acquire(self):
+        """Takes one token. Returns (allowed, seconds_until_next_token)."""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+class AdmissionController:
+    def __init__(self, cost_classes=None, max_buckets=MAX_TRACKED_BUCKETS, clock=time.monotonic):
+        self.cost_classes = cost_classes or COST_CLASSES
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = {name: anyio.Semaphore(c.max_concurrent, max_value=c.max_concurrent) for name, c in self.cost_classes.items()}
+
+    def _check_rate(self, key, cost_class):
+        config = self.cost_classes[cost_class]
+        with self._lock:
+            bucket = self._buckets.get((key, cost_class))
+            if bucket is None:
+                bucket = TokenBucket(config.rate, config.burst, self.clock)
+                self._buckets[(key, cost_class)] = bucket
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end((key, cost_class))
+            return bucket.try_acquire()
+
+    async def acquire(self, key, cost_class):
+        """Raises 429 (rate limit) or 503 (overloaded), otherwise takes a slot."""
+        allowed, retry_after = self._check_rate(key, cost_class)
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+        config = self.cost_classes[cost_class]
+        slots = self._slots[cost_class]
+        try:
+            if config.queue_timeout > 0:
+                with anyio.fail_after(config.queue_timeout):
+                    await slots.acquire()
+            else:
+                slots.acquire_nowait()
+        except (TimeoutError, anyio.WouldBlock):
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1" if config.queue_timeout else "5"}
+            )
+
+    def release(self, cost_class):
+        self._slots[cost_class].release()
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+admission = AdmissionController()
+
+def client_ip(request: Request):
+    if TRUSTED_PROXY_HOPS > 0:
+        # Each trusted proxy appends the address it got the request from, so the
+        # client is the entry TRUSTED_PROXY_HOPS from the end. Anything before
+        # it was sent by the client and can't be trusted.
+        hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+def _client_key(request: Request):
+    # Per-user when the endpoint gets a user_id, otherwise per client IP
+    user_id = request.query_params.get("user_id") or request.path_params.get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{client_ip(request)}"
+
+def admit(cost_class):
+    """
+    FastAPI dependency: `dependencies=[Depends(admit("read"))]`.
+    Holds one slot of the cost class for the duration of the request. It is
+    async so requests waiting for a slot don't tie up threadpool threads.
+    """
+    if cost_class not in admission.cost_classes:
+        raise ValueError(f"Unknown cost class: {cost_class}")
+
+    async def dependency(request: Request):
+        await admission.acquire(_client_key(request), cost_class)
+        try:
+            yield
+        finally:
+            admission.release(cost_class)
+
+    return dependency
@@ -0,0 +1,209 @@
+"""
+Global analytics rollups: popular tags, budget ranges and chosen destinations.
+
+The endpoints that change participants or the chosen option call the record_*
+helpers below inside their own transaction, so the rollup tables are always
+up to date and dashboard queries only read pre-aggregated buckets.
+
+To build the initial state from existing data (run once, before traffic):
+    python analytics.py --backfill
+"""
+import argparse
+import datetime
+from collections import Counter
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import models
+import utils
+
+PERIODS = ("day", "week")
+BACKFILL_BATCH_SIZE = 1000
+UPSERT_CHUNK = 150 # rows per INSERT (5 params each, stays under SQLite's limit)
+
+# dimension name -> (rollup model, key column name)
+DIMENSIONS = {
+    "tags": (models.TagRollup, "tag"),
+    "budgets": (models.BudgetRollup, "budget_range"),
+    "destinations": (models.DestinationRollup, "location"),
+}
+
+def bucket_starts(when):
+    """The (period, bucket_start) pairs a timestamp falls into."""
+    day = (when or datetime.datetime.utcnow()).date()
+    return [("day", day), ("week", day - datetime.timedelta(days=day.weekday()))]
+
+def chosen_location(itinerary_data, option_id):
+    chosen = utils.chosen_option(itinerary_data, option_id)
+    return chosen.get("location") if chosen else None
+
+def _upsert(db, model, key_name, deltas):
+    # deltas: {(period, bucket_start, key): change}
+    rows = [
+        {"period": period, "bucket_start": bucket, key_name: key, "count": change}
+        for (period, bucket, key), change in deltas.items() if change
+    ]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        # Portable (slower) path: update, insert if the bucket doesn't exist yet
+        key_col = getattr(model, key_name)
+        for row in rows:
+            updated = db.query(model).filter(
+                model.period == row["period"],
+                model.bucket_start == row["bucket_start"],
+                key_col == row[key_name]
+            ).update({model.count: model.count + row["count"]}, synchronize_session=False)
+            if not updated:
+                db.add(model(**row))
+        return
+
+    insert = sqlite_insert if dialect == "sqlite" else pg_insert
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        stmt = insert(model).values(rows[i:i + UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["period", "bucket_start", key_name],
+            set_={"count": model.count + stmt.excluded.count}
+        )
+        db.execute(stmt)
+
+def _participant_deltas(trip_created_at, participants, sign):
+    # participants: iterable of (budget_range, preference_tags)
+    tags, budgets = Counter(), Counter()
+    for budget_range, preference_tags in participants:
+        if budget_range:
+            budgets[budget_range] += sign
+        for tag in preference_tags or []:
+            tags[tag] += sign
+
+    tag_deltas, budget_deltas = Counter(), Counter()
+    for period, bucket in bucket_starts(trip_created_at):
+        for tag, change in tags.items():
+            tag_deltas[(period, bucket, tag)] += change
+        for budget, change in budgets.items():
+            budget_deltas[(period, bucket, budget)] += change
+    return tag_deltas, budget_deltas
+
+def record_participants(db, trip, participants, sign=1):
+    """Call with sign=1 when people join and sign=-1 when they leave."""
+    tag_deltas, budget_deltas = _participant_deltas(trip.created_at, participants, sign)
+    _upsert(db, models.TagRollup, "tag", tag_deltas)
+    _upsert(db, models.BudgetRollup, "budget_range", budget_deltas)
+
+def record_destination_change(db, trip, old_location, new_location):
+    if old_location == new_location:
+        return
+    deltas = Counter()
+    for period, bucket in bucket_starts(trip.created_at):
+        if old_location:
+            deltas[(period, bucket, old_location)] -= 1
+        if new_location:
+            deltas[(period, bucket, new_location)] += 1
+    _upsert(db, models.DestinationRollup, "location", deltas)
+
+# --- Dashboard Queries (cost grows with the number of buckets, not trips) ---
+def query_rollup(db, dimension, period="week", since=None, until=None, limit=10):
+    model, key_name = DIMENSIONS[dimension]
+    key_col = getattr(model, key_name)
+
+    filters = [model.period == period]
+    if since:
+        filters.append(model.bucket_start >= since)
+    if until:
+        filters.append(model.bucket_start <= until)
+
+    total = func.sum(model.count).label("total")
+    totals = (
+        db.query(key_col, total)
+        .filter(*filters)
+        .group_by(key_col)
+        .having(total > 0)
+        .order_by(total.desc(), key_col)
+        .limit(limit)
+        .all()
+    )
+
+    top_keys = [key for key, _ in totals]
+    series = []
+    if top_keys:
+        rows = (
+            db.query(model.bucket_start, key_col, model.count)
+            .filter(*filters, key_col.in_(top_keys))
+            .order_by(model.bucket_start, key_col)
+        )
+        series = [{"bucket_start": b, "name": k, "value": c} for b, k, c in rows]
+
+    return {
+        "period": period,
+        "totals": [{"name": k, "value": v} for k, v in totals],
+        "series": series,
+    }
+
+# --- Backfill ---
+def backfill(db, batch_size=BACKFILL_BATCH_SIZE):
+    """Rebuilds every rollup table from scratch, one batch of trips at a time."""
+    for model, _ in DIMENSIONS.values():
+        db.query(model).delete()
+    db.commit()
+
+    cursor, trips_done = 0, 0
+    while True:
+        trips = (
+            db.query(models.Trip.id, models.Trip.created_at, models.Trip.itinerary_data, models.Trip.final_chosen_option)
+            .filter(models.Trip.id > cursor)
+            .order_by(models.Trip.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not trips:
+            return trips_done
+
+        created = {t.id: t.created_at for t in trips}
+        tag_deltas, budget_deltas, destination_deltas = Counter(), Counter(), Counter()
+
+        participants = (
+            db.query(models.TripParticipant.trip_id, models.TripParticipant.budget_range, models.TripParticipant.preference_tags)
+            .filter(models.TripParticipant.trip_id.in_(list(created)))
+        )
+        for trip_id, budget_range, preference_tags in participants:
+            tags, budgets = _participant_deltas(created[trip_id], [(budget_range, preference_tags)], 1)
+            tag_deltas.update(tags)
+            budget_deltas.update(budgets)
+
+        for t in trips:
+            location = chosen_location(t.itinerary_data, t.final_chosen_option)
+            if location:
+                for period, bucket in bucket_starts(t.created_at):
+                    destination_deltas[(period, bucket, location)] += 1
+
+        _upsert(db, models.TagRollup, "tag", tag_deltas)
+        _upsert(db, models.BudgetRollup, "budget_range", budget_deltas)
+        _upsert(db, models.DestinationRollup, "location", destination_deltas)
+        db.commit()
+
+        cursor = trips[-1].id
+        trips_done += len(trips)
+        print(f"Backfilled {trips_done} trips...")
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Analytics rollup maintenance")
+    parser.add_argument("--backfill", action="store_true", help="rebuild all rollup tables from existing data")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+    else:
+        init_db()
+        db = SessionLocal()
+        try:
+            total = backfill(db, args.batch_size)
+            print(f"Done. Rollups rebuilt from {total} trips.")
+        finally:
+            db.close()
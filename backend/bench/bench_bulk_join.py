@@ -0,0 +1,55 @@
+"""
+Bulk join vs one /trips/join call per member.
+
+    python bench/bench_bulk_join.py --members 1000
+"""
+import argparse
+
+from common import Timer, disable_rate_limits, report, seed_users, use_temp_database
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=1000)
+    args = parser.parse_args()
+
+    use_temp_database()
+    disable_rate_limits()
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    leader_id, *member_ids = seed_users(args.members + 1)
+    client = TestClient(app_module.app)
+
+    def new_trip(name):
+        return client.post("/trips/create", json={
+            "user_id": leader_id, "trip_name": name, "home_town": "Pune", "budget_range": "₹5,000 - ₹10,000",
+            "start_date": "2026-12-01", "end_date": "2026-12-05", "preference_tags": ["Nature"], "voting_days": 3,
+        }).json()["trip_code"]
+
+    member = {
+        "home_town": "Mumbai", "budget_range": "₹10,000 - ₹20,000",
+        "start_date": "2026-12-01", "end_date": "2026-12-05", "preference_tags": ["Nature", "Food"],
+    }
+
+    # 1. One request (and one transaction) per member
+    code = new_trip("per-request")
+    with Timer() as per_request:
+        for user_id in member_ids:
+            r = client.post("/trips/join", json=dict(member, user_id=user_id, trip_code=code))
+            assert r.status_code == 200, r.text
+    report(f"/trips/join x {args.members}", per_request.seconds, args.members)
+
+    # 2. One bulk request
+    code = new_trip("bulk")
+    rows = [dict(member, email=f"bench{i}@example.com") for i in range(1, args.members + 1)]
+    with Timer() as bulk:
+        r = client.post(f"/trips/bulk-join?user_id={leader_id}", json={"trip_code": code, "participants": rows})
+    result = r.json()
+    assert result["joined"] == args.members, result
+    report(f"/trips/bulk-join ({args.members} rows)", bulk.seconds, args.members)
+
+    print(f"speedup: {per_request.seconds / bulk.seconds:.1f}x")
+
+if __name__ == "__main__":
+    main()
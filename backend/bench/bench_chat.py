@@ -0,0 +1,102 @@
+"""
+Trip chat at scale: memory per active conversation and per-message latency.
+
+Seeds --trips trips (each with a chosen itinerary and --people participants),
+loads every one into the chat cache, fills their recent-turn buffers, and
+compares the cache's own byte accounting with what tracemalloc sees. Then
+times POST /trips/{id}/chat for trips whose context is cached (warm) and for
+trips that have to be rebuilt from the database (cold).
+
+    python bench/bench_chat.py --trips 10000 --messages 2000
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from common import Timer, disable_rate_limits, percentile, seed_users, use_temp_database
+
+QUESTIONS = ["What is the plan for day 2?", "and the day after?", "Who is coming?", "How much will it cost?", "Where are we going?"]
+
+def seed(trips, people, users):
+    import models
+    from database import engine
+    from sqlalchemy import insert
+
+    itinerary = json.dumps({"options": [{
+        "id": 1, "title": "4 Days in Manali", "location": "Manali, Himachal Pradesh, India",
+        "total_estimated_cost": "₹18,000 per person",
+        "itinerary": [{"day": d, "activity": f"Day {d}: Solang valley, Old Manali cafes and the Mall Road market"} for d in range(1, 5)],
+    }]})
+    seed_users(users)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Trip), [
+            {"id": t, "trip_name": f"Trip {t}", "trip_code": f"C{t:07d}", "leader_id": t % users + 1,
+             "is_trip_confirmed": True, "itinerary_data": itinerary, "final_chosen_option": 1}
+            for t in range(1, trips + 1)
+        ])
+        conn.execute(insert(models.TripParticipant), [
+            {"trip_id": t, "user_id": (t + p) % users + 1, "home_town": "Pune", "preference_tags": ["Nature"]}
+            for t in range(1, trips + 1) for p in range(people)
+        ])
+
+def time_messages(client, trip_ids):
+    latencies = []
+    for trip_id in trip_ids:
+        with Timer() as t:
+            r = client.post(f"/trips/{trip_id}/chat", json={"message": random.choice(QUESTIONS), "user_id": 1})
+        assert r.status_code == 200, r.text
+        latencies.append(t.seconds)
+    return latencies
+
+def print_latencies(label, latencies):
+    print(f"{label:<45} p50 {percentile(latencies, 50) * 1000:7.2f} ms   p99 {percentile(latencies, 99) * 1000:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trips", type=int, default=10_000, help="active conversations")
+    parser.add_argument("--people", type=int, default=6, help="participants per trip")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=2000, help="chat messages to time per case")
+    args = parser.parse_args()
+
+    use_temp_database()
+    disable_rate_limits()
+    seed(args.trips, args.people, args.users)
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+    from chat_memory import RECENT_TURNS, memory
+    from database import SessionLocal
+
+    # 1. Memory: every trip's context cached, then every ring buffer full
+    db = SessionLocal()
+    tracemalloc.start()
+    for trip_id in range(1, args.trips + 1):
+        app_module.load_conversation(trip_id, db)
+    contexts_only = tracemalloc.get_traced_memory()[0]
+    for trip_id in range(1, args.trips + 1):
+        for turn in range(RECENT_TURNS // 2):
+            # Fresh strings per turn, like real messages (nothing shared between trips)
+            memory.add_turns(trip_id, [("user", f"{random.choice(QUESTIONS)} #{turn}"), ("bot", f"Day {turn}: Solang valley, Old Manali cafes and the Mall Road market")])
+    full = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    db.close()
+
+    stats = memory.stats()
+    assert stats["active_trips"] == args.trips, stats
+    print(f"{'traced memory per conversation (context)':<45} {contexts_only / args.trips / 1024:7.2f} KiB")
+    print(f"{'traced memory per conversation (+ turns)':<45} {full / args.trips / 1024:7.2f} KiB")
+    print(f"{'accounted by ChatMemory per conversation':<45} {stats['bytes'] / args.trips / 1024:7.2f} KiB")
+    print(f"{'total accounted':<45} {stats['bytes'] / 2**20:7.1f} MiB of {memory.max_bytes / 2**20:.0f} MiB cap\n")
+
+    # 2. Latency through the endpoint (includes storing both turns)
+    client = TestClient(app_module.app)
+    sample = random.sample(range(1, args.trips + 1), min(args.messages, args.trips))
+    print_latencies(f"chat, cached context (n={len(sample)})", time_messages(client, sample))
+    for trip_id in sample:
+        memory.invalidate(trip_id)
+    print_latencies(f"chat, rebuilt from database (n={len(sample)})", time_messages(client, sample))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Export throughput and peak memory.
+
+Seeds --rows participant rows (--per-trip people per trip, each with a vote),
+then runs the export once per format in a fresh process and reports rows/sec
+and that process's peak RSS. Memory should not grow with --rows.
+
+    python bench/bench_export.py --rows 10000000
+(10M rows needs a few GB of disk for the temp SQLite file and takes a while
+to seed; --rows 1000000 gives the rates in a minute or two.)
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from common import BACKEND_DIR, Timer, report, seed_users, use_temp_database
+
+SEED_BATCH = 50_000
+
+def seed(rows, per_trip, users):
+    import models
+    from database import engine
+    from sqlalchemy import insert
+
+    trips = -(-rows // per_trip)
+    itinerary = json.dumps({"options": [{"id": 1, "title": "3 Days in Goa", "location": "Goa, India"}]})
+    seed_users(users)
+    with engine.begin() as conn:
+        for start in range(0, trips, SEED_BATCH):
+            ids = range(start + 1, min(trips, start + SEED_BATCH) + 1)
+            conn.execute(insert(models.Trip), [
+                {"id": t, "trip_name": f"Trip {t}", "trip_code": f"B{t:08d}", "leader_id": t % users + 1,
+                 "is_trip_confirmed": t % 2 == 0, "itinerary_data": itinerary, "final_chosen_option": 1 if t % 2 == 0 else None}
+                for t in ids
+            ])
+
+        for start in range(0, rows, SEED_BATCH):
+            batch = range(start, min(rows, start + SEED_BATCH))
+            conn.execute(insert(models.TripParticipant), [
+                {"trip_id": r // per_trip + 1, "user_id": r % users + 1, "home_town": "Pune", "budget_range": "₹5,000 - ₹10,000",
+                 "start_date": "2026-12-01", "end_date": "2026-12-05", "preference_tags": ["Nature", "Food"]}
+                for r in batch
+            ])
+            conn.execute(insert(models.TripVote), [
+                {"trip_id": r // per_trip + 1, "user_id": r % users + 1, "option_selected": r % 2 + 1}
+                for r in batch
+            ])
+    return trips
+
+def peak_rss_kb():
+    # ru_maxrss survives fork + exec on Linux (the child would report the
+    # seeding parent's peak), so prefer this process's own high-water mark
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KiB on Linux
+
+def run_export(fmt, compress, chunk_size):
+    """Child process: runs one export into a byte counter and prints its stats."""
+    import export
+
+    baseline_kb = peak_rss_kb()
+    size = 0
+    started = time.perf_counter()
+    for chunk in export.export_stream(fmt, compress, chunk_size=chunk_size):
+        size += len(chunk)
+    print(json.dumps({
+        "seconds": time.perf_counter() - started,
+        "bytes": size,
+        "baseline_kb": baseline_kb,
+        "peak_kb": peak_rss_kb(),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="participant rows to export")
+    parser.add_argument("--per-trip", type=int, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "GZIP"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, BACKEND_DIR)
+        run_export(args.child[0], args.child[1] == "1", args.chunk_size)
+        return
+
+    use_temp_database()
+    with Timer() as seeding:
+        trips = seed(args.rows, args.per_trip, args.users)
+    report(f"seed {args.rows:,} rows / {trips:,} trips", seeding.seconds, args.rows)
+    print()
+
+    for fmt, compress in (("ndjson", False), ("csv", False), ("csv", True)):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", fmt, "1" if compress else "0", "--chunk-size", str(args.chunk_size)],
+            capture_output=True, text=True, check=True,
+        )
+        stats = json.loads(out.stdout.strip().splitlines()[-1])
+        label = fmt + (" + gzip" if compress else "")
+        report(f"export {label} ({stats['bytes'] / 2**20:,.0f} MiB)", stats["seconds"], args.rows)
+        print(f"{'':<45} peak RSS {stats['peak_kb'] / 1024:8.1f} MiB (after imports {stats['baseline_kb'] / 1024:.1f} MiB)")
+
+if __name__ == "__main__":
+    main()
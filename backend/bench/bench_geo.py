@@ -0,0 +1,90 @@
+"""
+Hometown geocoding throughput and the travel-distance matrix.
+
+Geocoding is timed per kind of input (exact name, spelling alias, nearby town,
+typo that needs the fuzzy match, unknown place), both bypassing the
+lru_cache and through it. The distance matrix is timed at --origins x
+--destinations with NumPy, against a plain Python haversine loop on a slice.
+
+    python bench/bench_geo.py --origins 1000 --destinations 10000
+"""
+import argparse
+import math
+import random
+import sys
+
+from common import BACKEND_DIR, Timer, report
+
+sys.path.insert(0, BACKEND_DIR)
+
+import geo
+
+INPUTS = {
+    "exact": ["Mumbai", "Pune, Maharashtra", "Bengaluru", "Jaipur", "Kochi, Kerala, India"],
+    "alias": ["bombay", "Bangalore", "poona", "Madras", "Trivandrum"],
+    "nearby": ["Thane", "Navi Mumbai", "Secunderabad", "Mohali", "Margao"],
+    "fuzzy": ["Mumbay", "Bengaluu", "Hyderbad", "Chenai", "Ahmadabad"],
+    "unknown": ["Springfield", "Atlantis", "Gotham", "Hogsmeade", "Narnia"],
+}
+
+def python_matrix(origins, destinations):
+    rows = []
+    for lat1, lon1 in origins:
+        lat1, lon1 = math.radians(lat1), math.radians(lon1)
+        row = []
+        for lat2, lon2 in destinations:
+            lat2, lon2 = math.radians(lat2), math.radians(lon2)
+            a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+            row.append(2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a))))
+        rows.append(row)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--origins", type=int, default=1000)
+    parser.add_argument("--destinations", type=int, default=10_000)
+    parser.add_argument("--lookups", type=int, default=2000, help="geocode calls per input kind")
+    args = parser.parse_args()
+
+    # 1. Geocoding: uncached (lru_cache bypassed) vs warm cache
+    geo._load()
+    uncached = geo._geocode_normalized.__wrapped__
+    print("-- geocode")
+    for kind, names in INPUTS.items():
+        with Timer() as cold:
+            for i in range(args.lookups):
+                uncached(geo._normalize(names[i % len(names)]))
+        geo._geocode_normalized.cache_clear()
+        with Timer() as warm:
+            for i in range(args.lookups):
+                geo.geocode(names[i % len(names)])
+        report(f"{kind:<8} uncached", cold.seconds, args.lookups)
+        report(f"{kind:<8} cached", warm.seconds, args.lookups)
+
+    # 2. Distance matrix
+    rng = random.Random(7)
+    origins = [(rng.uniform(8, 35), rng.uniform(68, 97)) for _ in range(args.origins)]
+    destinations = [(rng.uniform(8, 35), rng.uniform(68, 97)) for _ in range(args.destinations)]
+    cells = args.origins * args.destinations
+
+    print(f"\n-- distance matrix {args.origins:,} x {args.destinations:,}")
+    geo.distance_matrix_km([(0, 0)], [(0, 0)]) # NumPy import is not part of the timing
+    with Timer() as vectorized:
+        matrix = geo.distance_matrix_km(origins, destinations)
+    report("NumPy distance_matrix_km", vectorized.seconds, cells)
+
+    sample = max(1, args.origins // 100)
+    with Timer() as looped:
+        expected = python_matrix(origins[:sample], destinations)
+    report(f"pure Python ({sample} origins)", looped.seconds, sample * args.destinations)
+    assert abs(matrix[0, 0] - expected[0][0]) < 1e-6
+
+    candidates = [{"lat": lat, "lon": lon} for lat, lon in destinations]
+    with Timer() as ranking:
+        geo.rank_destinations(origins, candidates)
+    report("rank_destinations (matrix + sort)", ranking.seconds, cells)
+    per_cell_python = looped.seconds / (sample * args.destinations)
+    print(f"speedup vs pure Python: {per_cell_python * cells / vectorized.seconds:.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Read latency while expensive traffic is saturated.
+
+Keeps calling GET /trips/1 (the "read" class) during two scenarios:
+
+1. Generation: --generators clients keep calling POST /trips/{id}/generate for
+   --duration seconds against a stubbed Gemini that takes --llm-seconds per
+   call, so the "llm" slots stay full. The per-user llm rate limit is lifted
+   for this phase so the concurrency budget is what gets exercised; extra
+   generations should be shed with 503 right away.
+2. Logins: --logins concurrent POST /login requests (bcrypt, "hashing" class),
+   each from its own client IP. Requests waiting for a hashing slot wait on
+   the event loop, so they don't hold threadpool threads.
+
+In both, reads should stay close to their unloaded latency.
+
+    python bench/bench_overload.py --generators 40 --logins 250
+"""
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import io
+import itertools
+import json
+import time
+from collections import Counter
+
+from common import percentile, seed_users, use_temp_database
+
+_ips = (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in itertools.count(1))
+
+STUB_ITINERARY = json.dumps({"analysis_summary": "bench", "options": [
+    {"id": 1, "title": "3 Days in Goa", "location": "Goa, India", "itinerary": []},
+    {"id": 2, "title": "3 Days in Manali", "location": "Manali, Himachal Pradesh, India", "itinerary": []},
+]})
+
+def as_client(ip=None):
+    # Every request gets its own client IP so per-IP rate limits don't kick in
+    return {"X-Forwarded-For": ip or next(_ips)}
+
+async def probe_reads(client, count=None, until=None):
+    latencies = []
+    while (count is not None and len(latencies) < count) or (until is not None and not until.done()):
+        started = time.perf_counter()
+        r = await client.get("/trips/1", headers=as_client())
+        latencies.append(time.perf_counter() - started)
+        assert r.status_code == 200, r.text
+    return latencies
+
+def print_latencies(label, latencies):
+    print(f"{label:<32} n={len(latencies):<5} p50 {percentile(latencies, 50) * 1000:8.1f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:8.1f} ms   max {max(latencies) * 1000:8.1f} ms")
+
+def print_statuses(label, statuses, elapsed):
+    print(f"{label:<32} {dict(sorted(statuses.items()))} in {elapsed:.2f}s (503s: {statuses.get(503, 0)})")
+
+async def generation_phase(client, args):
+    import admission
+    import recommendation_service
+
+    def slow_gemini(prompt):
+        time.sleep(args.llm_seconds)
+        return STUB_ITINERARY
+
+    recommendation_service.gemini_provider = slow_gemini
+    classes = dict(admission.COST_CLASSES)
+    classes["llm"] = dataclasses.replace(classes["llm"], rate=1e9, burst=10**9)
+    admission.admission = admission.AdmissionController(classes)
+
+    statuses = Counter()
+    deadline = time.perf_counter() + args.duration
+
+    async def generator():
+        while time.perf_counter() < deadline:
+            r = await client.post("/trips/1/generate?user_id=1", headers=as_client())
+            statuses[r.status_code] += 1
+            if r.status_code == 503:
+                await asyncio.sleep(0.05) # a client backing off before retrying
+
+    with contextlib.redirect_stdout(io.StringIO()): # generate prints debug lines
+        started = time.perf_counter()
+        load = asyncio.ensure_future(asyncio.gather(*(generator() for _ in range(args.generators))))
+        latencies = await probe_reads(client, until=load)
+        await load
+        elapsed = time.perf_counter() - started
+
+    print_latencies(f"GET /trips/1 ({args.generators} generators)", latencies)
+    print_statuses("generate statuses", statuses, elapsed)
+    admission.admission = admission.AdmissionController()
+
+async def login_phase(client, args):
+    async def login(i):
+        r = await client.post("/login", headers=as_client(), json={"email": f"bench{i % args.users}@example.com", "password": "benchpass1"})
+        return r.status_code
+
+    with contextlib.redirect_stdout(io.StringIO()): # login prints debug lines
+        started = time.perf_counter()
+        flood = asyncio.ensure_future(asyncio.gather(*(login(i) for i in range(args.logins))))
+        latencies = await probe_reads(client, until=flood)
+        statuses = Counter(await flood)
+        elapsed = time.perf_counter() - started
+
+    print_latencies(f"GET /trips/1 ({args.logins} logins)", latencies)
+    print_statuses("login statuses", statuses, elapsed)
+
+async def run(args):
+    import httpx
+    import admission
+    import main as app_module
+
+    admission.TRUSTED_PROXY_HOPS = 1
+    slots = {name: c.max_concurrent for name, c in admission.COST_CLASSES.items()}
+    print(f"slots: {slots}\n")
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        r = await client.post("/trips/create", headers=as_client(), json={
+            "user_id": 1, "trip_name": "Overload", "home_town": "Pune", "budget_range": "₹5,000 - ₹10,000",
+            "start_date": "2026-12-01", "end_date": "2026-12-05", "preference_tags": ["Nature"], "voting_days": 3,
+        })
+        assert r.status_code == 200, r.text
+
+        print_latencies("GET /trips/1 (idle)", await probe_reads(client, count=args.reads))
+        print()
+        await generation_phase(client, args)
+        print()
+        await login_phase(client, args)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generators", type=int, default=40, help="clients calling /generate in a loop")
+    parser.add_argument("--llm-seconds", type=float, default=2.0, help="stubbed Gemini latency")
+    parser.add_argument("--duration", type=float, default=6.0, help="seconds of generation load")
+    parser.add_argument("--logins", type=int, default=250)
+    parser.add_argument("--reads", type=int, default=200, help="reads on the idle server")
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    use_temp_database()
+    seed_users(args.users)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Serialization microbenchmarks for the biggest response payloads.
+
+"old" is FastAPI's default path: validate through the response model (where
+the endpoint has one), jsonable_encoder, then json.dumps. "new" is what the
+endpoints do now: orjson, with the stored itinerary passed through as an
+orjson.Fragment.
+
+    python bench/bench_serialization.py --trips 500 --group 1000 --days 14
+"""
+import argparse
+import datetime
+import json
+import sys
+import timeit
+
+import orjson
+
+from common import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.encoders import jsonable_encoder
+
+import schemas
+
+def old_path(payload, response_model=None):
+    if response_model is not None:
+        payload = response_model.model_validate(payload)
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode("utf-8")
+
+def new_path(payload):
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+
+def itinerary_blob(days):
+    option = lambda i: {
+        "id": i, "title": f"Option {i}", "location": "Manali, Himachal Pradesh, India",
+        "total_estimated_cost": "₹25,000 per person", "vibe_match": "Adventure, Nature",
+        "why_its_perfect": "Mountains, rafting and cafes for everyone. " * 5,
+        "itinerary": [{"day": d, "activity": f"Day {d}: trek, lunch by the river, evening market walk. " * 3} for d in range(1, days + 1)],
+    }
+    return json.dumps({"analysis_summary": "Group summary. " * 20, "options": [option(1), option(2)]})
+
+def run(label, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    size = len(fn())
+    print(f"{label:<38} {seconds * 1e6:10.1f} us/op   {size / 1024:8.1f} KiB")
+    return seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trips", type=int, default=500, help="trips on the profile page")
+    parser.add_argument("--group", type=int, default=1000, help="participants in the trip details")
+    parser.add_argument("--days", type=int, default=14, help="days per itinerary option")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    # 1. GET /trips/{id}/itinerary
+    stored = itinerary_blob(args.days)
+    votes = {1: 12, 2: 9}
+    old = lambda: old_path({"has_generated": True, "data": json.loads(stored), "votes": votes, "user_vote": 1, "final_choice": None})
+    new = lambda: new_path({"has_generated": True, "data": orjson.Fragment(stored), "votes": votes, "user_vote": 1, "final_choice": None})
+    print(f"-- itinerary ({args.days} days x 2 options)")
+    speedup = run("old: loads + jsonable_encoder + dumps", old, args.number) / run("new: orjson + Fragment passthrough", new, args.number)
+    print(f"{'speedup':<38} {speedup:10.1f}x\n")
+
+    # 2. GET /users/{id}/profile
+    trip = lambda i: {"id": i, "trip_code": f"C{i:05d}", "trip_name": f"Trip number {i}", "is_trip_confirmed": i % 2 == 0, "is_voting_closed": i % 3 == 0}
+    profile = {
+        "first_name": "Asha", "last_name": "Rao", "email": "asha@example.com", "gender": "Female", "age": 27,
+        "created_trips": [trip(i) for i in range(args.trips)],
+        "joined_trips": [trip(i) for i in range(args.trips, 2 * args.trips)],
+    }
+    print(f"-- profile ({2 * args.trips} trips)")
+    speedup = run("old: UserProfile + encoder + dumps", lambda: old_path(profile, schemas.UserProfile), args.number) / run("new: orjson", lambda: new_path(profile), args.number)
+    print(f"{'speedup':<38} {speedup:10.1f}x\n")
+
+    # 3. GET /trips/{id}
+    details = {
+        "id": 1, "trip_name": "College reunion", "trip_code": "ABC123", "leader_id": 1, "is_trip_confirmed": False,
+        "created_at": datetime.datetime(2026, 10, 1, 12, 0),
+        "participants": [f"Person{i}" for i in range(args.group)],
+        "budget_stats": [{"name": f"₹{i},000+", "value": i} for i in range(4)],
+        "tag_stats": [{"name": f"Tag{i}", "value": i} for i in range(5)],
+        "has_itinerary": True,
+    }
+    print(f"-- trip details ({args.group} participants)")
+    speedup = run("old: TripDetail + encoder + dumps", lambda: old_path(details, schemas.TripDetail), args.number) / run("new: orjson", lambda: new_path(details), args.number)
+    print(f"{'speedup':<38} {speedup:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Cold start: import time and time to first request.
+
+Each run is a fresh Python process (nothing cached in sys.modules), timing
+`import main` and then the first request through the app, lifespan included.
+Runs once with the schema check on startup (INIT_DB_ON_STARTUP=1, the
+default) and once with it moved to the deploy step (INIT_DB_ON_STARTUP=0).
+
+    python bench/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from common import BACKEND_DIR, percentile, use_temp_database
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    status = client.get("/trips/1").status_code
+first_request = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "first_request": first_request - started,
+    "status": status,
+    "sdk_loaded": "google.generativeai" in sys.modules,
+}))
+"""
+
+def run_child(init_db):
+    env = dict(os.environ, INIT_DB_ON_STARTUP="1" if init_db else "0", PYTHONPATH=BACKEND_DIR)
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    # Tables exist already, like a deploy where `python database.py` has run
+    use_temp_database()
+
+    for init_db in (True, False):
+        results = [run_child(init_db) for _ in range(args.runs)]
+        assert all(r["status"] == 404 for r in results), results
+        print(f"-- INIT_DB_ON_STARTUP={int(init_db)} ({args.runs} cold starts)")
+        for field, label in (("import", "import main"), ("first_request", "import + first request")):
+            samples = [r[field] for r in results]
+            print(f"{label:<30} p50 {percentile(samples, 50) * 1000:8.1f} ms   p95 {percentile(samples, 95) * 1000:8.1f} ms")
+        print(f"{'Gemini SDK imported':<30} {any(r['sdk_loaded'] for r in results)}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Shared setup for the benchmark scripts in this folder.
+
+Every script runs against a throwaway SQLite database in a temp directory,
+so it never touches backend/tripchalo.db. Run them from anywhere, e.g.:
+    python bench/bench_bulk_join.py --members 1000
+
+They need the dev requirements too: pip install -r requirements-dev.txt
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def use_temp_database():
+    """Switches to a fresh temp dir (database.py uses ./tripchalo.db) and creates the tables."""
+    tmp = tempfile.mkdtemp(prefix="tripchalo-bench-")
+    atexit.register(shutil.rmtree, tmp, True)
+    os.chdir(tmp)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    from database import init_db
+    init_db()
+    return tmp
+
+def disable_rate_limits():
+    """Swaps in an admission controller with effectively unlimited budgets."""
+    import admission
+    unlimited = {
+        name: admission.CostClass(rate=1e9, burst=10**9, max_concurrent=10**6, queue_timeout=0.0)
+        for name in admission.COST_CLASSES
+    }
+    admission.admission = admission.AdmissionController(unlimited)
+
+def seed_users(count, prefix="bench"):
+    """Inserts `count` users in one go (sharing a single bcrypt hash). Returns their ids."""
+    import models, utils
+    from database import SessionLocal
+    from sqlalchemy import insert
+
+    hashed = utils.hash_password("benchpass1")
+    rows = [
+        {
+            "first_name": f"{prefix}{i}", "last_name": "User", "gender": "Other", "age": 25,
+            "email": f"{prefix}{i}@example.com", "hashed_password": hashed,
+            "security_question": "What is your favorite food?", "hashed_security_answer": hashed,
+        }
+        for i in range(count)
+    ]
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.User), rows)
+        db.commit()
+        return [uid for (uid,) in db.query(models.User.id).filter(models.User.email.like(f"{prefix}%@example.com")).order_by(models.User.id)]
+    finally:
+        db.close()
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+
+def report(label, seconds, count=None):
+    line = f"{label:<45} {seconds * 1000:10.1f} ms"
+    if count:
+        line += f"   {count / seconds:12,.0f} /s"
+    print(line)
@@ -0,0 +1,117 @@
+"""
+In-memory state for active trip chats.
+
+Each active trip keeps its built context (chosen itinerary + participant
+names) and a ring buffer of its most recent turns, so a chat message doesn't
+have to rebuild anything from the database. Trips are evicted least recently
+used first, both past MAX_ACTIVE_TRIPS and past a hard MAX_MEMORY_BYTES cap.
+
+Every turn is also stored in the chat_messages table (the full history); this
+cache only holds what the bot needs to answer follow-ups.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", "10"))
+MAX_ACTIVE_TRIPS = int(os.getenv("CHAT_MAX_ACTIVE_TRIPS", "20000"))
+MAX_MEMORY_BYTES = int(os.getenv("CHAT_MAX_MEMORY_BYTES", str(256 * 1024 * 1024)))
+# Other workers can change a trip, so cached context is rebuilt after this long
+CONTEXT_TTL_SECONDS = float(os.getenv("CHAT_CONTEXT_TTL_SECONDS", "300"))
+
+# Rough fixed cost of one conversation entry (dicts, deque, bookkeeping)
+_ENTRY_OVERHEAD_BYTES = 1024
+# Parsed JSON takes several times its serialized size as Python dicts and
+# strings, and every turn is a tuple plus a str header. Measured with
+# bench/bench_chat.py so MAX_MEMORY_BYTES is close to the real footprint.
+_CONTEXT_SIZE_FACTOR = 5
+_TURN_OVERHEAD_BYTES = 120
+
+class Conversation:
+    __slots__ = ("trip_context", "people", "turns", "context_bytes", "turn_bytes", "built_at")
+
+    def __init__(self, trip_context, people, context_bytes, history=()):
+        self.trip_context = trip_context
+        self.people = people
+        self.context_bytes = context_bytes
+        self.turns = deque(maxlen=RECENT_TURNS)
+        self.turn_bytes = 0
+        self.built_at = time.monotonic()
+        for role, message in history:
+            self.add_turn(role, message)
+
+    def add_turn(self, role, message):
+        if len(self.turns) == self.turns.maxlen:
+            _, dropped = self.turns[0]
+            self.turn_bytes -= _turn_size(dropped)
+        self.turns.append((role, message))
+        self.turn_bytes += _turn_size(message)
+
+    @property
+    def size(self):
+        return _ENTRY_OVERHEAD_BYTES + self.context_bytes * _CONTEXT_SIZE_FACTOR + self.turn_bytes
+
+def _turn_size(message):
+    # UTF-8 bytes, not characters (Hindi or emoji text is 3-4 bytes a character)
+    return _TURN_OVERHEAD_BYTES + len(message.encode("utf-8"))
+
+class ChatMemory:
+    def __init__(self, max_trips=MAX_ACTIVE_TRIPS, max_bytes=MAX_MEMORY_BYTES, ttl=CONTEXT_TTL_SECONDS):
+        self.max_trips = max_trips
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conversations = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, trip_id):
+        """The cached conversation, or None if it isn't cached (or is stale)."""
+        with self._lock:
+            convo = self._conversations.get(trip_id)
+            if convo is None:
+                return None
+            if time.monotonic() - convo.built_at > self.ttl:
+                self._remove(trip_id)
+                return None
+            self._conversations.move_to_end(trip_id)
+            return convo
+
+    def put(self, trip_id, convo):
+        with self._lock:
+            self._remove(trip_id)
+            self._conversations[trip_id] = convo
+            self._bytes += convo.size
+            self._evict()
+
+    def add_turns(self, trip_id, turns):
+        with self._lock:
+            convo = self._conversations.get(trip_id)
+            if convo is None:
+                return
+            self._bytes -= convo.size
+            for role, message in turns:
+                convo.add_turn(role, message)
+            self._bytes += convo.size
+            self._evict()
+
+    def invalidate(self, trip_id):
+        """Drop a trip's cached context (call when the trip or its people change)."""
+        with self._lock:
+            self._remove(trip_id)
+
+    def stats(self):
+        with self._lock:
+            return {"active_trips": len(self._conversations), "bytes": self._bytes}
+
+    def _remove(self, trip_id):
+        convo = self._conversations.pop(trip_id, None)
+        if convo is not None:
+            self._bytes -= convo.size
+
+    def _evict(self):
+        while self._conversations and (len(self._conversations) > self.max_trips or self._bytes > self.max_bytes):
+            _, convo = self._conversations.popitem(last=False)
+            self._bytes -= convo.size
+
+memory = ChatMemory()
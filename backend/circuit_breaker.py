@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker is open and the call was not attempted."""
+
+class CircuitBreaker:
+    """
+    Stops calling a failing/slow upstream for a while.
+
+    - CLOSED: calls go through. Errors and calls slower than `slow_call_seconds`
+      both count as failures. `failure_threshold` failures in a row opens it.
+    - OPEN: calls are rejected instantly with CircuitOpenError until
+      `reset_timeout` seconds have passed.
+    - HALF_OPEN: one trial call is let through. Success closes the breaker,
+      failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, slow_call_seconds=20.0, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def allow_request(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self, elapsed):
+        if elapsed >= self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def call(self, func, *args, **kwargs):
+        """Runs func through the breaker. Every attempt is recorded as a success or failure."""
+        if not self.allow_request():
+            raise CircuitOpenError("Upstream is unavailable, circuit is open")
+
+        started = self.clock()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(self.clock() - started)
+        return result
+
+class LatencyTracker:
+    """Keeps the last `window` successful call latencies to estimate p95."""
+
+    def __init__(self, window=100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, default=None):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return default
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+class HedgedCaller:
+    """
+    Runs `func` and, if it hasn't answered within the current p95 latency,
+    fires one backup call and returns whichever finishes first successfully.
+    The slower call is left to finish in the background and is ignored.
+    """
+
+    def __init__(self, min_hedge_delay=2.0, default_hedge_delay=8.0, timeout=30.0, max_workers=8):
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.timeout = timeout
+        self.latency = LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def hedge_delay(self):
+        p95 = self.latency.percentile(95, default=self.default_hedge_delay)
+        return max(self.min_hedge_delay, p95)
+
+    def call(self, func, *args, **kwargs):
+        started = time.monotonic()
+        pending = {self._pool.submit(func, *args, **kwargs)}
+        hedged = False
+        last_error = None
+
+        while pending:
+            remaining = self.timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            wait_for = remaining if hedged else min(remaining, self.hedge_delay() - (time.monotonic() - started))
+            done, pending = wait(pending, timeout=max(0.0, wait_for), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                self.latency.record(time.monotonic() - started)
+                return result
+
+            # First attempt is slow (or failed): send one backup request
+            if not hedged:
+                hedged = True
+                pending.add(self._pool.submit(func, *args, **kwargs))
+
+        if last_error is not None and not pending:
+            raise last_error
+        raise TimeoutError(f"No response within {self.timeout}s")
@@ -18,4 +18,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Creates any missing tables and indexes. Called on app startup (see
+# main.create_app) or run it once as a deploy/migration step: `python database.py`
+def init_db():
+    import models # Registers the tables on Base
+    Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so indexes added to an
+    # existing table later on are created here
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+if __name__ == "__main__":
+    init_db()
+    print("Database tables are ready.")
@@ -0,0 +1,171 @@
+"""
+Bulk export of trips with their participants, votes and chosen itinerary.
+
+Streams in fixed-size chunks keyed on trip id, so memory stays flat no matter
+how big the tables are, and an interrupted export can be resumed by passing the
+last trip id it wrote as the cursor.
+
+Used by GET /admin/export, or from the command line:
+    python export.py --format csv --gzip -o trips.csv.gz
+    python export.py --cursor 41000 > rest.ndjson
+"""
+import argparse
+import csv
+import io
+import sys
+import zlib
+
+import orjson
+
+import models
+import utils
+from database import SessionLocal
+
+DEFAULT_CHUNK_SIZE = 1000
+
+CSV_COLUMNS = [
+    "trip_id", "trip_name", "trip_code", "leader_id", "created_at",
+    "is_trip_confirmed", "final_chosen_option", "chosen_title", "chosen_location",
+    "participant_user_id", "participant_name", "home_town", "budget_range",
+    "start_date", "end_date", "preference_tags", "vote_option",
+]
+
+def iter_trip_records(db, cursor=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields one dict per trip with id > cursor, in id order.
+    Each chunk costs three queries (trips, participants + names, votes) no
+    matter how many people are in the trips.
+    """
+    while True:
+        trips = (
+            db.query(models.Trip)
+            .filter(models.Trip.id > cursor)
+            .order_by(models.Trip.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not trips:
+            return
+
+        trip_ids = [t.id for t in trips]
+
+        participants = {}
+        rows = (
+            db.query(models.TripParticipant, models.User.first_name, models.User.last_name)
+            .outerjoin(models.User, models.User.id == models.TripParticipant.user_id)
+            .filter(models.TripParticipant.trip_id.in_(trip_ids))
+            .order_by(models.TripParticipant.id)
+            .execution_options(stream_results=True)
+        )
+        for p, first_name, last_name in rows:
+            participants.setdefault(p.trip_id, []).append({
+                "user_id": p.user_id,
+                "name": f"{first_name or ''} {last_name or ''}".strip(),
+                "home_town": p.home_town,
+                "budget_range": p.budget_range,
+                "start_date": p.start_date,
+                "end_date": p.end_date,
+                "preference_tags": p.preference_tags or [],
+            })
+
+        votes = {}
+        vote_rows = (
+            db.query(models.TripVote.trip_id, models.TripVote.user_id, models.TripVote.option_selected)
+            .filter(models.TripVote.trip_id.in_(trip_ids))
+            .execution_options(stream_results=True)
+        )
+        for trip_id, user_id, option in vote_rows:
+            votes.setdefault(trip_id, {})[user_id] = option
+
+        for trip in trips:
+            yield {
+                "cursor": trip.id,
+                "id": trip.id,
+                "trip_name": trip.trip_name,
+                "trip_code": trip.trip_code,
+                "leader_id": trip.leader_id,
+                "created_at": trip.created_at,
+                "is_trip_confirmed": trip.is_trip_confirmed,
+                "final_chosen_option": trip.final_chosen_option,
+                "chosen_itinerary": utils.chosen_option(trip.itinerary_data, trip.final_chosen_option),
+                "participants": participants.get(trip.id, []),
+                "votes": [{"user_id": u, "option": o} for u, o in votes.get(trip.id, {}).items()],
+            }
+
+        cursor = trips[-1].id
+        # Drop the loaded objects so the session doesn't grow with the export
+        db.expunge_all()
+
+def ndjson_lines(records):
+    for record in records:
+        yield orjson.dumps(record) + b"\n"
+
+def csv_lines(records):
+    """One row per participant (trips with nobody in them still get one row)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+
+    for record in records:
+        chosen = record["chosen_itinerary"] or {}
+        trip_cols = [
+            record["id"], record["trip_name"], record["trip_code"], record["leader_id"],
+            record["created_at"].isoformat() if record["created_at"] else "",
+            record["is_trip_confirmed"], record["final_chosen_option"] or "",
+            chosen.get("title", ""), chosen.get("location", ""),
+        ]
+        vote_by_user = {v["user_id"]: v["option"] for v in record["votes"]}
+
+        for p in record["participants"] or [None]:
+            if p is None:
+                writer.writerow(trip_cols + [""] * 8)
+                continue
+            writer.writerow(trip_cols + [
+                p["user_id"], p["name"], p["home_town"], p["budget_range"],
+                p["start_date"], p["end_date"], ";".join(p["preference_tags"]),
+                vote_by_user.get(p["user_id"], ""),
+            ])
+        yield flush()
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(fmt="ndjson", compress=False, cursor=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Bytes generator for the whole export. Opens (and closes) its own session."""
+    db = SessionLocal()
+    try:
+        records = iter_trip_records(db, cursor, chunk_size)
+        lines = csv_lines(records) if fmt == "csv" else ndjson_lines(records)
+        yield from (gzip_stream(lines) if compress else lines)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export trips, participants and votes")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--cursor", type=int, default=0, help="resume after this trip id")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_stream(args.format, args.gzip, args.cursor, args.chunk_size):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
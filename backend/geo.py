@@ -0,0 +1,128 @@
+"""
+Offline geo helpers: hometown geocoding and group travel distances.
+
+- geocode() turns free-text hometowns ("bombay", "Bengaluru, KA") into a
+  gazetteer entry using the bundled data/gazetteer.json (no network calls).
+  Each entry has "aliases" (other spellings or old names of the same city)
+  and "nearby" (separate towns close enough to share its coordinates, like
+  Thane for Mumbai).
+- distance_matrix_km() computes great-circle distances between every origin
+  and every destination in one vectorized NumPy pass.
+- rank_destinations() orders candidate destinations by total and worst-case
+  group travel distance.
+"""
+import difflib
+import json
+import os
+import re
+from functools import lru_cache
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.json")
+EARTH_RADIUS_KM = 6371.0
+FUZZY_CUTOFF = 0.8 # difflib similarity needed for a fuzzy match
+
+_places = None
+_index = None     # every name, alias and nearby town -> place
+_spellings = None # only names and aliases -> place
+
+def _normalize(text):
+    text = (text or "").lower()
+    text = re.sub(r"[^a-z\s,]", " ", text)
+    # "Pune, Maharashtra, India" -> "pune"
+    text = text.split(",")[0]
+    return re.sub(r"\s+", " ", text).strip()
+
+def _load():
+    global _places, _index, _spellings
+    if _index is None:
+        with open(GAZETTEER_PATH, encoding="utf-8") as f:
+            places = json.load(f)
+        spellings = {}
+        for place in places:
+            for name in [place["name"]] + place.get("aliases", []):
+                spellings.setdefault(_normalize(name), place)
+        index = dict(spellings)
+        for place in places:
+            for name in place.get("nearby", []):
+                index.setdefault(_normalize(name), place)
+        _places, _spellings, _index = places, spellings, index
+    return _index
+
+@lru_cache(maxsize=4096)
+def _geocode_normalized(key):
+    index = _load()
+    if not key:
+        return None
+    if key in index:
+        return index[key]
+    match = difflib.get_close_matches(key, index.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    return index[match[0]] if match else None
+
+def geocode(text):
+    """Gazetteer entry {"name", "region", "lat", "lon"} for a place name, or None."""
+    return _geocode_normalized(_normalize(text))
+
+def normalize_home_town(text):
+    """
+    Canonical spelling for a hometown ("bombay" -> "Mumbai, Maharashtra").
+    Only exact names and spelling aliases are rewritten. Nearby towns
+    ("Thane") and fuzzy matches keep what the user typed; geocode() still
+    places them for distances.
+    """
+    _load()
+    place = _spellings.get(_normalize(text))
+    if not place:
+        return text
+    # "Goa", not "Goa, Goa"
+    return place["name"] if place["name"] == place["region"] else f"{place['name']}, {place['region']}"
+
+def distance_matrix_km(origins, destinations):
+    """
+    Haversine distances in km. origins is N (lat, lon) pairs, destinations is
+    M pairs; returns an N x M NumPy array.
+    """
+    import numpy as np # Imported here so app startup doesn't pay for NumPy
+
+    o = np.radians(np.asarray(origins, dtype=np.float64).reshape(-1, 2))
+    d = np.radians(np.asarray(destinations, dtype=np.float64).reshape(-1, 2))
+
+    lat1, lon1 = o[:, 0:1], o[:, 1:2] # (N, 1)
+    lat2, lon2 = d[:, 0], d[:, 1]     # (M,)
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def group_origins(home_towns):
+    """(lat, lon) for every hometown we can place; unknown ones are skipped."""
+    origins = []
+    for town in home_towns:
+        place = geocode(town)
+        if place:
+            origins.append((place["lat"], place["lon"]))
+    return origins
+
+def rank_destinations(origins, candidates):
+    """
+    candidates: dicts with "lat" and "lon" (e.g. offline_planner catalog entries).
+    Returns [(candidate, total_km, worst_km), ...] sorted by total then worst.
+    With no known origins, candidates come back in their original order.
+    """
+    if not candidates:
+        return []
+    if not origins:
+        return [(c, None, None) for c in candidates]
+
+    matrix = distance_matrix_km(origins, [(c["lat"], c["lon"]) for c in candidates])
+    totals = matrix.sum(axis=0)
+    worst = matrix.max(axis=0)
+
+    ranked = sorted(range(len(candidates)), key=lambda i: (totals[i], worst[i]))
+    return [(candidates[i], round(float(totals[i])), round(float(worst[i]))) for i in ranked]
+
+def group_travel_km(origins, location):
+    """{"total": km, "worst": km} for the group to reach `location`, or None."""
+    place = geocode(location)
+    if not place or not origins:
+        return None
+    distances = distance_matrix_km(origins, [(place["lat"], place["lon"])])[:, 0]
+    return {"total": round(float(distances.sum())), "worst": round(float(distances.max()))}
@@ -0,0 +1,170 @@
+"""
+Idempotency-Key support for retry-prone POST endpoints.
+
+The frontend can send `Idempotency-Key: <random id>` with create/join/vote.
+The first request with a key runs normally and its response is remembered for
+IDEMPOTENCY_TTL_SECONDS (unless it was a 5xx or a retryable status like 429). Any retry with the same key (including ones that
+arrive while the first is still running) gets the stored response back without
+running the endpoint again, so there is exactly one trip/join/vote.
+
+Entries live in process memory, so run a single worker per instance or put a
+sticky load balancer in front if you scale out.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+# How long a retry waits for the original request to finish before giving up
+IDEMPOTENCY_WAIT_SECONDS = 30.0
+
+# "Try again later" answers (rate limited, busy, conflicting in-flight work).
+# They say nothing about the outcome, so like 5xx they aren't stored and the
+# client's retry with the same key runs the request for real.
+RETRYABLE_STATUSES = {408, 409, 423, 425, 429}
+
+IDEMPOTENT_ROUTES = [
+    re.compile(r"^/trips/create$"),
+    re.compile(r"^/trips/join$"),
+    re.compile(r"^/trips/\d+/vote$"),
+]
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires_at", "done", "status", "headers", "body")
+
+    def __init__(self, fingerprint, expires_at):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.done = asyncio.Event()
+        self.status = None
+        self.headers = None
+        self.body = None
+
+class IdempotencyStore:
+    def __init__(self, ttl=IDEMPOTENCY_TTL_SECONDS, max_keys=IDEMPOTENCY_MAX_KEYS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def _expire(self):
+        now = self.clock()
+        # Entries are kept in insertion order, so expired ones are at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.max_keys:
+                break
+            self._entries.popitem(last=False)
+            entry.done.set() # wake anyone still waiting on it
+
+    def claim(self, key, fingerprint):
+        """Returns (entry, is_new). is_new means the caller must run the request."""
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry, False
+        entry = _Entry(fingerprint, self.clock() + self.ttl)
+        self._entries[key] = entry
+        return entry, True
+
+    def complete(self, key, entry, status, headers, body):
+        entry.status, entry.headers, entry.body = status, headers, body
+        entry.done.set()
+
+    def abandon(self, key, entry):
+        # Server errors and retryable statuses aren't cached, so the client's next retry runs for real
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.done.set()
+
+    def clear(self):
+        self._entries.clear()
+
+store = IdempotencyStore()
+
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware (so the request body can be read and replayed)."""
+
+    def __init__(self, app, store=store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+
+        idem_key = _header(scope, b"idempotency-key")
+        path = scope["path"]
+        if not idem_key or not any(route.match(path) for route in IDEMPOTENT_ROUTES):
+            return await self.app(scope, receive, send)
+
+        # Read the whole body so it can be fingerprinted and passed on
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        fingerprint = hashlib.sha256(scope.get("query_string", b"") + b"\0" + body).hexdigest()
+        key = f"{path}:{idem_key}"
+        entry, is_new = self.store.claim(key, fingerprint)
+
+        if not is_new:
+            return await self._replay(entry, fingerprint, send)
+
+        async def replay_receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        status, headers, chunks = None, [], []
+
+        async def capture_send(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() == b"content-type"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except Exception:
+            self.store.abandon(key, entry)
+            raise
+
+        if status is None or status >= 500 or status in RETRYABLE_STATUSES:
+            self.store.abandon(key, entry)
+        else:
+            self.store.complete(key, entry, status, headers, b"".join(chunks))
+
+    async def _replay(self, entry, fingerprint, send):
+        if entry.fingerprint != fingerprint:
+            return await self._send(send, 422, [(b"content-type", b"application/json")],
+                                    b'{"detail":"Idempotency-Key was already used with a different request"}')
+        try:
+            await asyncio.wait_for(entry.done.wait(), timeout=IDEMPOTENCY_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+        if entry.status is None:
+            # Original request failed or is still running: let the client retry later
+            return await self._send(send, 409, [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+                                    b'{"detail":"Original request with this Idempotency-Key is not finished"}')
+
+        return await self._send(send, entry.status, entry.headers + [(b"idempotent-replayed", b"true")], entry.body)
+
+    async def _send(self, send, status, headers, body):
+        headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,30 +1,41 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from database import engine, SessionLocal, Base
+from database import SessionLocal, init_db
 import models, schemas, utils
+from admission import admit
 import random
+import secrets
 import string
 import datetime            # <--- This was missing
 from datetime import timedelta
 from collections import Counter
+from contextlib import asynccontextmanager
 import recommendation_service # Import the AI file
+import export
+import analytics
+import geo
+from idempotency import IdempotencyMiddleware
+from chat_memory import memory as chat_memory, Conversation, RECENT_TURNS
 import json
-from pydantic import BaseModel
-
-# Create Database Tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
-
-# CORS Setup (Allows Frontend to talk to Backend)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Change this to "*" to allow any URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+import orjson
+import csv
+import io
+import os
+from pydantic import BaseModel, ValidationError
+from typing import Literal
+
+# --- Fast JSON Responses ---
+# orjson is much faster than the default json encoder. Int keys (e.g. vote counts)
+# are allowed, and orjson.Fragment values are written out as-is.
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+# All endpoints live on this router; create_app() (bottom of file) mounts it
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Dependency to get DB session
 def get_db():
@@ -35,7 +46,7 @@ def get_db():
         db.close()
 
 # --- 1. SIGNUP ENDPOINT ---
-@app.post("/signup", response_model=schemas.UserResponse)
+@router.post("/signup", response_model=schemas.UserResponse, dependencies=[Depends(admit("hashing"))])
 def signup(user_in: schemas.UserSignup, db: Session = Depends(get_db)):
     # Check if email already exists
     existing_user = db.query(models.User).filter(models.User.email == user_in.email).first()
@@ -69,7 +80,7 @@ def signup(user_in: schemas.UserSignup, db: Session = Depends(get_db)):
     return new_user
 
 # --- 2. LOGIN ENDPOINT ---
-@app.post("/login")
+@router.post("/login", dependencies=[Depends(admit("hashing"))])
 def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
     
     # # 1. Find the user
@@ -107,39 +118,51 @@ def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
     }
 
 # --- 3. GET USER PROFILE & TRIPS ---
-@app.get("/users/{user_id}/profile", response_model=schemas.UserProfile)
+@router.get("/users/{user_id}/profile", response_model=schemas.UserProfile, dependencies=[Depends(admit("read"))])
 def get_user_profile(user_id: int, db: Session = Depends(get_db)):
     # 1. Fetch User
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # Only the TripSummary columns (skips loading the big itinerary_data blobs)
+    summary_columns = (
+        models.Trip.id,
+        models.Trip.trip_code,
+        models.Trip.trip_name,
+        models.Trip.is_trip_confirmed,
+        models.Trip.is_voting_closed,
+    )
+
     # 2. Fetch Created Trips (User is Leader)
-    created_trips = db.query(models.Trip).filter(models.Trip.leader_id == user_id).all()
+    created_trips = db.query(*summary_columns).filter(models.Trip.leader_id == user_id).all()
 
     # 3. Fetch Joined Trips (User is Participant)
-    # We query the 'TripParticipant' table to find trips this user joined
-    participation_records = db.query(models.TripParticipant).filter(models.TripParticipant.user_id == user_id).all()
-    
-    # Extract the actual Trip objects from the participation records
-    joined_trips = [record.trip for record in participation_records]
+    # One JOIN instead of loading each participation record's trip separately
+    joined_trips = (
+        db.query(*summary_columns)
+        .join(models.TripParticipant, models.TripParticipant.trip_id == models.Trip.id)
+        .filter(models.TripParticipant.user_id == user_id)
+        .all()
+    )
 
-    return {
+    # Rows already match TripSummary, so skip re-validating through the response model
+    return ORJSONResponse({
         "first_name": user.first_name,
         "last_name": user.last_name,
         "email": user.email,
         "gender": user.gender,
         "age": user.age,
-        "created_trips": created_trips,
-        "joined_trips": joined_trips
-    }
+        "created_trips": [row._asdict() for row in created_trips],
+        "joined_trips": [row._asdict() for row in joined_trips]
+    })
 
 # --- Helper: Generate Unique 6-Char Code ---
 def generate_trip_code():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
 
 # --- 4. CREATE TRIP ENDPOINT ---
-@app.post("/trips/create")
+@router.post("/trips/create", dependencies=[Depends(admit("write"))])
 def create_trip(trip_in: schemas.TripCreate, db: Session = Depends(get_db)):
     # 1. Generate Unique Code
     new_code = generate_trip_code()
@@ -166,20 +189,21 @@ def create_trip(trip_in: schemas.TripCreate, db: Session = Depends(get_db)):
     leader_entry = models.TripParticipant(
         user_id=trip_in.user_id,
         trip_id=new_trip.id,
-        home_town=trip_in.home_town,
+        home_town=geo.normalize_home_town(trip_in.home_town),
         budget_range=trip_in.budget_range,
         start_date=trip_in.start_date,
         end_date=trip_in.end_date,
         preference_tags=trip_in.preference_tags
     )
     db.add(leader_entry)
+    analytics.record_participants(db, new_trip, [(trip_in.budget_range, trip_in.preference_tags)])
     db.commit()
 
     return {"status": "success", "trip_id": new_trip.id, "trip_code": new_code}
 
 
 # --- 5. JOIN TRIP ENDPOINT ---
-@app.post("/trips/join")
+@router.post("/trips/join", dependencies=[Depends(admit("write"))])
 def join_trip(join_in: schemas.TripJoin, db: Session = Depends(get_db)):
     # 1. Find the Trip by Code
     trip = db.query(models.Trip).filter(models.Trip.trip_code == join_in.trip_code).first()
@@ -204,31 +228,164 @@ def join_trip(join_in: schemas.TripJoin, db: Session = Depends(get_db)):
     new_participant = models.TripParticipant(
         user_id=join_in.user_id,
         trip_id=trip.id,
-        home_town=join_in.home_town,
+        home_town=geo.normalize_home_town(join_in.home_town),
         budget_range=join_in.budget_range,
         start_date=join_in.start_date,
         end_date=join_in.end_date,
         preference_tags=join_in.preference_tags
     )
     db.add(new_participant)
+    analytics.record_participants(db, trip, [(join_in.budget_range, join_in.preference_tags)])
     db.commit()
+    chat_memory.invalidate(trip.id)
 
     return {"status": "success", "trip_id": trip.id, "trip_name": trip.trip_name}
 
+# --- Helper: Bulk Add Participants (one transaction for the whole batch) ---
+BULK_LOOKUP_CHUNK = 500 # Keeps IN (...) lists under SQLite's variable limit
+
+def bulk_add_participants(trip, rows, db: Session, errors=None):
+    # rows is a list of (row_number, schemas.BulkParticipant)
+    errors = errors if errors is not None else []
+
+    # 1. Resolve every email to a user id in one query per chunk
+    emails = list({row.email.strip() for _, row in rows})
+    user_ids = {}
+    for i in range(0, len(emails), BULK_LOOKUP_CHUNK):
+        chunk = emails[i:i + BULK_LOOKUP_CHUNK]
+        for user_id, email in db.query(models.User.id, models.User.email).filter(models.User.email.in_(chunk)):
+            user_ids[email] = user_id
+
+    # 2. Find who is already on the trip (set-based, not one query per row)
+    ids = list(set(user_ids.values()))
+    already_joined = set()
+    for i in range(0, len(ids), BULK_LOOKUP_CHUNK):
+        chunk = ids[i:i + BULK_LOOKUP_CHUNK]
+        already_joined.update(
+            user_id for (user_id,) in db.query(models.TripParticipant.user_id).filter(
+                models.TripParticipant.trip_id == trip.id,
+                models.TripParticipant.user_id.in_(chunk)
+            )
+        )
+
+    # 3. Build the insert batch, reporting bad rows instead of aborting
+    new_rows = []
+    for row_num, row in rows:
+        email = row.email.strip()
+        user_id = user_ids.get(email)
+        if user_id is None:
+            errors.append({"row": row_num, "email": email, "detail": "No user registered with this email"})
+            continue
+        if user_id in already_joined:
+            errors.append({"row": row_num, "email": email, "detail": "Already joined this trip"})
+            continue
+        already_joined.add(user_id) # Also catches duplicates inside the batch
+        new_rows.append({
+            "user_id": user_id,
+            "trip_id": trip.id,
+            "home_town": geo.normalize_home_town(row.home_town),
+            "budget_range": row.budget_range,
+            "start_date": row.start_date,
+            "end_date": row.end_date,
+            "preference_tags": row.preference_tags
+        })
+
+    # 4. Single bulk insert + single commit
+    if new_rows:
+        db.execute(insert(models.TripParticipant), new_rows)
+        analytics.record_participants(db, trip, [(r["budget_range"], r["preference_tags"]) for r in new_rows])
+    db.commit()
+    chat_memory.invalidate(trip.id)
+
+    return {
+        "status": "success",
+        "trip_id": trip.id,
+        "joined": len(new_rows),
+        "errors": sorted(errors, key=lambda e: e["row"])
+    }
+
+def get_open_trip_for_leader(trip_code: str, user_id: int, db: Session):
+    trip = db.query(models.Trip).filter(models.Trip.trip_code == trip_code).first()
+    if not trip:
+        raise HTTPException(status_code=404, detail="Invalid Trip Code")
+    if trip.leader_id != user_id:
+        raise HTTPException(status_code=403, detail="Only the Leader can import participants")
+    if trip.is_trip_confirmed or trip.is_voting_closed:
+        raise HTTPException(status_code=400, detail="Voting is completed! You cannot join this trip anymore.")
+    return trip
+
+# --- Helper: Validate bulk rows one by one (bad rows become errors, not a 422) ---
+def parse_bulk_rows(records, start=1):
+    rows, errors = [], []
+    for row_num, record in enumerate(records, start=start):
+        if not isinstance(record, dict):
+            errors.append({"row": row_num, "email": "", "detail": "Row must be an object"})
+            continue
+        # csv.DictReader puts cells past the last header column under the key None
+        extra = record.pop(None, None)
+        if extra:
+            errors.append({"row": row_num, "email": str(record.get("email") or ""), "detail": f"Row has {len(extra)} more cell(s) than the header"})
+            continue
+        try:
+            rows.append((row_num, schemas.BulkParticipant(**record)))
+        except ValidationError as e:
+            invalid = ", ".join(str(err["loc"][0]) for err in e.errors())
+            errors.append({"row": row_num, "email": str(record.get("email") or ""), "detail": f"Invalid fields: {invalid}"})
+    return rows, errors
+
+# --- 5b. BULK JOIN (Leader imports a list of participants) ---
+@router.post("/trips/bulk-join", response_model=schemas.BulkJoinResult, dependencies=[Depends(admit("write"))])
+def bulk_join_trip(bulk_in: schemas.TripBulkJoin, user_id: int, db: Session = Depends(get_db)):
+    trip = get_open_trip_for_leader(bulk_in.trip_code, user_id, db)
+    rows, errors = parse_bulk_rows(bulk_in.participants)
+    return bulk_add_participants(trip, rows, db, errors)
+
+# --- 5c. BULK JOIN FROM CSV ---
+# Columns: email, home_town, budget_range, start_date, end_date, preference_tags
+# preference_tags are separated by ';' (e.g. "Beach;Adventure")
+@router.post("/trips/bulk-join/csv", response_model=schemas.BulkJoinResult, dependencies=[Depends(admit("write"))])
+def bulk_join_trip_csv(
+    user_id: int,
+    trip_code: str = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    trip = get_open_trip_for_leader(trip_code, user_id, db)
+
+    try:
+        text = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    records = []
+    for record in csv.DictReader(io.StringIO(text)):
+        tags = record.get("preference_tags") or ""
+        record["preference_tags"] = [t.strip() for t in tags.split(";") if t.strip()]
+        records.append(record)
+
+    # Row 1 is the header, so data rows start at 2 (matches the spreadsheet line)
+    rows, errors = parse_bulk_rows(records, start=2)
+    return bulk_add_participants(trip, rows, db, errors)
+
 # --- 6. GET TRIP DETAILS (With Stats) ---
-@app.get("/trips/{trip_id}", response_model=schemas.TripDetail)
+@router.get("/trips/{trip_id}", response_model=schemas.TripDetail, dependencies=[Depends(admit("read"))])
 def get_trip_details(trip_id: int, db: Session = Depends(get_db)):
     # 1. Fetch Trip
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
         
-    # 2. Fetch Participants
-    participants = db.query(models.TripParticipant).filter(models.TripParticipant.trip_id == trip_id).all()
+    # 2. Fetch Participants (with names in the same query, not one lookup per person)
+    participants = (
+        db.query(models.TripParticipant.budget_range, models.TripParticipant.preference_tags, models.User.first_name)
+        .join(models.User, models.User.id == models.TripParticipant.user_id)
+        .filter(models.TripParticipant.trip_id == trip_id)
+        .order_by(models.TripParticipant.id)
+        .all()
+    )
     
     # 3. Calculate Stats
     # A. Names
-    participant_names = [db.query(models.User).filter(models.User.id == p.user_id).first().first_name for p in participants]
+    participant_names = [p.first_name for p in participants]
     
     # B. Budgets (Count frequency)
     budget_counts = Counter([p.budget_range for p in participants])
@@ -237,25 +394,27 @@ def get_trip_details(trip_id: int, db: Session = Depends(get_db)):
     # C. Tags (Flatten list and count)
     all_tags = []
     for p in participants:
-        all_tags.extend(p.preference_tags)
+        all_tags.extend(p.preference_tags or [])
     tag_counts = Counter(all_tags)
     # Get top 5 tags
     tag_stats = [{"name": k, "value": v} for k, v in tag_counts.most_common(5)]
 
-    return {
+    # Built to match TripDetail already, so skip the response model validation pass
+    return ORJSONResponse({
         "id": trip.id,
         "trip_name": trip.trip_name,
         "trip_code": trip.trip_code,
         "leader_id": trip.leader_id,
         "is_trip_confirmed": trip.is_trip_confirmed,
+        "created_at": trip.created_at,
         "participants": participant_names,
         "budget_stats": budget_stats,
         "tag_stats": tag_stats,
         "has_itinerary": bool(trip.itinerary_data)
-    }
+    })
 
 # --- 7. LEADER ACTION: LOCK TRIP ---
-@app.post("/trips/{trip_id}/lock")
+@router.post("/trips/{trip_id}/lock", dependencies=[Depends(admit("write"))])
 def lock_trip(trip_id: int, user_id: int, db: Session = Depends(get_db)):
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
     
@@ -274,7 +433,7 @@ def lock_trip(trip_id: int, user_id: int, db: Session = Depends(get_db)):
 # ... inside backend/main.py ...
 
 # --- 8. DELETE TRIP (Leader Only) ---
-@app.delete("/trips/{trip_id}")
+@router.delete("/trips/{trip_id}", dependencies=[Depends(admit("write"))])
 def delete_trip(trip_id: int, user_id: int, db: Session = Depends(get_db)):
     # 1. Fetch Trip
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
@@ -285,17 +444,24 @@ def delete_trip(trip_id: int, user_id: int, db: Session = Depends(get_db)):
     if trip.leader_id != user_id:
         raise HTTPException(status_code=403, detail="Only the Leader can delete this trip")
 
-    # 3. Delete Participants first (Cleanup)
+    # 3. Delete Participants first (Cleanup) and take them out of the analytics rollups
+    participants = db.query(models.TripParticipant.budget_range, models.TripParticipant.preference_tags).filter(
+        models.TripParticipant.trip_id == trip_id
+    ).all()
+    analytics.record_participants(db, trip, participants, sign=-1)
+    analytics.record_destination_change(db, trip, analytics.chosen_location(trip.itinerary_data, trip.final_chosen_option), None)
     db.query(models.TripParticipant).filter(models.TripParticipant.trip_id == trip_id).delete()
+    db.query(models.ChatMessage).filter(models.ChatMessage.trip_id == trip_id).delete()
 
     # 4. Delete Trip
     db.delete(trip)
     db.commit()
+    chat_memory.invalidate(trip_id)
 
     return {"status": "success", "message": "Trip deleted successfully"}
 
 # --- 9. LEAVE TRIP (Participant Only) ---
-@app.delete("/trips/{trip_id}/leave")
+@router.delete("/trips/{trip_id}/leave", dependencies=[Depends(admit("write"))])
 def leave_trip(trip_id: int, user_id: int, db: Session = Depends(get_db)):
     # 1. Fetch Trip
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
@@ -317,12 +483,14 @@ def leave_trip(trip_id: int, user_id: int, db: Session = Depends(get_db)):
 
     # 4. Delete Record
     db.delete(participant)
+    analytics.record_participants(db, trip, [(participant.budget_range, participant.preference_tags)], sign=-1)
     db.commit()
+    chat_memory.invalidate(trip_id)
 
     return {"status": "success", "message": "You have left the trip"}
 
 # --- 10. GENERATE ITINERARY (AI) ---
-@app.post("/trips/{trip_id}/generate")
+@router.post("/trips/{trip_id}/generate", dependencies=[Depends(admit("llm"))])
 def generate_itinerary(trip_id: int, user_id: int, db: Session = Depends(get_db)):
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
     
@@ -347,19 +515,21 @@ def generate_itinerary(trip_id: int, user_id: int, db: Session = Depends(get_db)
         })
 
     # 2. Call AI Service
+    # Always returns a plan (the offline planner answers if the AI can't)
     ai_result = recommendation_service.get_trip_recommendations(pref_list)
-    
-    if not ai_result:
-        raise HTTPException(status_code=500, detail="AI Generation Failed")
 
     # 3. Save to DB (Store as JSON string)
-    trip.itinerary_data = json.dumps(ai_result)
+    old_location = analytics.chosen_location(trip.itinerary_data, trip.final_chosen_option)
+    trip.itinerary_data = orjson.dumps(ai_result).decode()
+    analytics.record_destination_change(db, trip, old_location, analytics.chosen_location(trip.itinerary_data, trip.final_chosen_option))
     db.commit()
+    chat_memory.invalidate(trip_id)
     
-    return {"status": "success", "data": ai_result}
+    # Reuse the bytes we just stored instead of encoding the result a second time
+    return ORJSONResponse({"status": "success", "data": orjson.Fragment(trip.itinerary_data)})
 
 # --- 11. GET ITINERARY & VOTES ---
-@app.get("/trips/{trip_id}/itinerary")
+@router.get("/trips/{trip_id}/itinerary", dependencies=[Depends(admit("read"))])
 def get_itinerary(trip_id: int, user_id: int, db: Session = Depends(get_db)):
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
     if not trip or not trip.itinerary_data:
@@ -376,16 +546,17 @@ def get_itinerary(trip_id: int, user_id: int, db: Session = Depends(get_db)):
         if v.user_id == user_id:
             user_vote = v.option_selected
 
-    return {
+    # The stored itinerary is already JSON: pass it through as-is (no decode/re-encode)
+    return ORJSONResponse({
         "has_generated": True,
-        "data": json.loads(trip.itinerary_data),
+        "data": orjson.Fragment(trip.itinerary_data),
         "votes": vote_counts,
         "user_vote": user_vote,
         "final_choice": trip.final_chosen_option
-    }
+    })
 
 # --- 12. VOTE FOR OPTION ---
-@app.post("/trips/{trip_id}/vote")
+@router.post("/trips/{trip_id}/vote", dependencies=[Depends(admit("write"))])
 def vote_itinerary(trip_id: int, user_id: int, option_id: int, db: Session = Depends(get_db)):
     # Check if user already voted
     existing_vote = db.query(models.TripVote).filter(
@@ -403,18 +574,21 @@ def vote_itinerary(trip_id: int, user_id: int, option_id: int, db: Session = Dep
     return {"status": "voted"}
 
 # --- 13. FINALIZE OPTION (Leader) ---
-@app.post("/trips/{trip_id}/finalize")
+@router.post("/trips/{trip_id}/finalize", dependencies=[Depends(admit("write"))])
 def finalize_trip_option(trip_id: int, user_id: int, option_id: int, db: Session = Depends(get_db)):
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
     if trip.leader_id != user_id: raise HTTPException(status_code=403)
     
+    old_location = analytics.chosen_location(trip.itinerary_data, trip.final_chosen_option)
     trip.final_chosen_option = option_id
+    analytics.record_destination_change(db, trip, old_location, analytics.chosen_location(trip.itinerary_data, option_id))
     db.commit()
+    chat_memory.invalidate(trip_id)
     return {"status": "finalized"}
 
 
 # --- 1. GET FULL TRIP DETAILS (For the Page) ---
-@app.get("/trips/{trip_id}/confirmed-details")
+@router.get("/trips/{trip_id}/confirmed-details", dependencies=[Depends(admit("read"))])
 def get_confirmed_trip_details(trip_id: int, db: Session = Depends(get_db)):
     # Fetch Trip
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
@@ -434,20 +608,13 @@ def get_confirmed_trip_details(trip_id: int, db: Session = Depends(get_db)):
     # For this implementation, let's assume 'itinerary_data' holds the full JSON of all options
     # and we need to grab the one that matches 'final_chosen_option'.
     
-    import json
     final_itinerary = {}
     location_name = "Unknown"
     
-    if trip.itinerary_data and trip.final_chosen_option:
-        try:
-            all_data = json.loads(trip.itinerary_data)
-            # Find the option with the matching ID
-            chosen = next((opt for opt in all_data.get("options", []) if opt["id"] == trip.final_chosen_option), None)
-            if chosen:
-                final_itinerary = chosen.get("itinerary", [])
-                location_name = chosen.get("location", "Unknown")
-        except:
-            pass
+    chosen = utils.chosen_option(trip.itinerary_data, trip.final_chosen_option)
+    if chosen:
+        final_itinerary = chosen.get("itinerary", [])
+        location_name = chosen.get("location", "Unknown")
 
     return {
         "id": trip.id,
@@ -463,34 +630,164 @@ def get_confirmed_trip_details(trip_id: int, db: Session = Depends(get_db)):
 # --- 2. CHAT BOT ENDPOINT ---
 class ChatRequest(BaseModel):
     message: str
+    user_id: int | None = None
 
-@app.post("/trips/{trip_id}/chat")
-def chat_with_trip_bot(trip_id: int, chat_req: ChatRequest, db: Session = Depends(get_db)):
-    # 1. Fetch Trip Data again to give context to the bot
+CHAT_HISTORY_PAGE_SIZE = 50
+
+# --- Helper: Build (or reuse) the bot's context for a trip ---
+def load_conversation(trip_id: int, db: Session):
+    convo = chat_memory.get(trip_id)
+    if convo:
+        return convo
+
+    # 1. Fetch Trip Data to give context to the bot
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
         
     # 2. Reconstruct the context dictionary
-    import json
-    trip_context = {}
-    if trip.itinerary_data and trip.final_chosen_option:
-        try:
-            all_data = json.loads(trip.itinerary_data)
-            chosen = next((opt for opt in all_data.get("options", []) if opt["id"] == trip.final_chosen_option), None)
-            if chosen:
-                trip_context = chosen # The whole object (location, cost, itinerary)
-        except:
-            pass
-
-    # 3. Fetch Participants for context
-    participants = db.query(models.TripParticipant).filter(models.TripParticipant.trip_id == trip_id).all()
-    people_context = []
-    for p in participants:
-        u = db.query(models.User).filter(models.User.id == p.user_id).first()
-        if u: people_context.append({"name": u.first_name})
+    # The whole chosen option (location, cost, itinerary)
+    trip_context = utils.chosen_option(trip.itinerary_data, trip.final_chosen_option) or {}
+
+    # 3. Fetch Participants for context (names in the same query)
+    names = (
+        db.query(models.User.first_name)
+        .join(models.TripParticipant, models.TripParticipant.user_id == models.User.id)
+        .filter(models.TripParticipant.trip_id == trip_id)
+        .all()
+    )
+    people_context = [{"name": name} for (name,) in names]
+
+    # 4. Recent turns, so follow-up questions still work after a restart
+    recent = (
+        db.query(models.ChatMessage.role, models.ChatMessage.message)
+        .filter(models.ChatMessage.trip_id == trip_id)
+        .order_by(models.ChatMessage.id.desc())
+        .limit(RECENT_TURNS)
+        .all()
+    )
+
+    context_bytes = len(orjson.dumps(trip_context)) + len(orjson.dumps(people_context))
+    convo = Conversation(trip_context, people_context, context_bytes, history=reversed(recent))
+    chat_memory.put(trip_id, convo)
+    return convo
 
-    # 4. Call the Python Logic
-    bot_reply = recommendation_service.smart_trip_chat(trip_context, people_context, chat_req.message)
+@router.post("/trips/{trip_id}/chat", dependencies=[Depends(admit("write"))])
+def chat_with_trip_bot(trip_id: int, chat_req: ChatRequest, db: Session = Depends(get_db)):
+    convo = load_conversation(trip_id, db)
+
+    # Call the Python Logic (recent turns let it resolve "and the day after?")
+    bot_reply = recommendation_service.smart_trip_chat(
+        convo.trip_context, convo.people, chat_req.message, history=list(convo.turns)
+    )
+
+    # Append both turns to the history table and the in-memory buffer
+    db.execute(insert(models.ChatMessage), [
+        {"trip_id": trip_id, "user_id": chat_req.user_id, "role": "user", "message": chat_req.message},
+        {"trip_id": trip_id, "user_id": None, "role": "bot", "message": bot_reply},
+    ])
+    db.commit()
+    chat_memory.add_turns(trip_id, [("user", chat_req.message), ("bot", bot_reply)])
     
-    return {"response": bot_reply}
\ No newline at end of file
+    return {"response": bot_reply}
+
+# --- 3. CHAT HISTORY (newest page first, pass next_before_id to go back further) ---
+@router.get("/trips/{trip_id}/chat/history", dependencies=[Depends(admit("read"))])
+def get_chat_history(
+    trip_id: int,
+    before_id: int = None,
+    limit: int = Query(CHAT_HISTORY_PAGE_SIZE, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    query = db.query(models.ChatMessage).filter(models.ChatMessage.trip_id == trip_id)
+    if before_id:
+        query = query.filter(models.ChatMessage.id < before_id)
+    page = query.order_by(models.ChatMessage.id.desc()).limit(limit).all()
+
+    messages = [
+        {"id": m.id, "role": m.role, "user_id": m.user_id, "message": m.message, "created_at": m.created_at}
+        for m in reversed(page)
+    ]
+    return {
+        "messages": messages,
+        "next_before_id": page[-1].id if len(page) == limit else None
+    }
+
+
+# --- Helper: Admin Check ---
+# Admin endpoints need the X-Admin-Token header to match the ADMIN_TOKEN env var
+def require_admin(x_admin_token: str = Header(None)):
+    admin_token = os.getenv("ADMIN_TOKEN")
+    # compare_digest takes the same time wherever the strings differ, so the token can't be guessed byte by byte
+    if not admin_token or not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+# --- ADMIN: BULK EXPORT (NDJSON / CSV) ---
+# To resume an interrupted export, pass the last trip id you received as ?cursor=
+@router.get("/admin/export", dependencies=[Depends(require_admin), Depends(admit("export"))])
+def export_trips(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    cursor: int = 0,
+    chunk_size: int = Query(export.DEFAULT_CHUNK_SIZE, ge=1, le=10000)
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"trips.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        export.export_stream(format, gzip, cursor, chunk_size),
+        media_type=media_type,
+        headers=headers
+    )
+
+# --- ADMIN: ANALYTICS DASHBOARD ---
+# dimension is "tags", "budgets" or "destinations". Reads the rollup tables only.
+@router.get("/admin/analytics/{dimension}", dependencies=[Depends(require_admin), Depends(admit("read"))])
+def get_analytics(
+    dimension: Literal["tags", "budgets", "destinations"],
+    period: Literal["day", "week"] = "week",
+    since: datetime.date = None,
+    until: datetime.date = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    return analytics.query_rollup(db, dimension, period, since, until, limit)
+
+# --- APP FACTORY ---
+# Nothing expensive happens at import time: tables are created on startup (or by
+# running `python database.py` as a deploy step) and the Gemini SDK is only
+# imported on the first generation request.
+def create_app(create_tables=None):
+    if create_tables is None:
+        # Set INIT_DB_ON_STARTUP=0 in production once `python database.py` runs at deploy
+        create_tables = os.getenv("INIT_DB_ON_STARTUP", "1") == "1"
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if create_tables:
+            init_db()
+        yield
+
+    app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+    # Replays retried create/join/vote requests that carry an Idempotency-Key
+    # (added before CORS so replayed responses still get CORS headers)
+    app.add_middleware(IdempotencyMiddleware)
+
+    # CORS Setup (Allows Frontend to talk to Backend)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Change this to "*" to allow any URL
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.include_router(router)
+
+    return app
+
+app = create_app()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime, Date, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -47,7 +47,7 @@ class TripParticipant(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    trip_id = Column(Integer, ForeignKey("trips.id"))
+    trip_id = Column(Integer, ForeignKey("trips.id"), index=True)
     
     home_town = Column(String)
     budget_range = Column(String) 
@@ -63,9 +63,55 @@ class TripVote(Base):
     __tablename__ = "trip_votes"
 
     id = Column(Integer, primary_key=True, index=True)
-    trip_id = Column(Integer, ForeignKey("trips.id"))
+    trip_id = Column(Integer, ForeignKey("trips.id"), index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     option_selected = Column(Integer) # 1 or 2
 
     trip = relationship("Trip", back_populates="votes")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+# --- TRIP CHAT HISTORY (append-only) ---
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    trip_id = Column(Integer, ForeignKey("trips.id"), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True) # None for bot replies
+    role = Column(String, nullable=False) # "user" or "bot"
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# --- ANALYTICS ROLLUP TABLES ---
+# Pre-aggregated counts, kept up to date by the join/leave/finalize endpoints
+# (see analytics.py). Bucketed by the trip's creation day or week so that
+# leaving a trip decrements the same bucket joining it incremented.
+# period is "day" or "week" (bucket_start is the Monday for weeks).
+class TagRollup(Base):
+    __tablename__ = "rollup_tags"
+    __table_args__ = (UniqueConstraint("period", "bucket_start", "tag"),)
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String, nullable=False)
+    bucket_start = Column(Date, nullable=False, index=True)
+    tag = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+class BudgetRollup(Base):
+    __tablename__ = "rollup_budgets"
+    __table_args__ = (UniqueConstraint("period", "bucket_start", "budget_range"),)
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String, nullable=False)
+    bucket_start = Column(Date, nullable=False, index=True)
+    budget_range = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+class DestinationRollup(Base):
+    __tablename__ = "rollup_destinations"
+    __table_args__ = (UniqueConstraint("period", "bucket_start", "location"),)
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String, nullable=False)
+    bucket_start = Column(Date, nullable=False, index=True)
+    location = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,148 @@
+import json
+import os
+import re
+import datetime
+from collections import Counter
+
+import geo
+
+# Bundled catalog of destinations (tags, rough daily cost per person, activities)
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "destinations.json")
+
+DEFAULT_TRIP_DAYS = 3
+MAX_TRIP_DAYS = 7
+
+_catalog = None
+
+def load_catalog():
+    global _catalog
+    if _catalog is None:
+        with open(CATALOG_PATH, encoding="utf-8") as f:
+            _catalog = json.load(f)
+    return _catalog
+
+def parse_budget(budget_range):
+    """
+    Turns a budget string like "₹10,000 - ₹20,000" or "₹50,000+" into (low, high).
+    high is None when the range is open-ended. Returns None if nothing parses.
+    """
+    numbers = [int(n.replace(",", "")) for n in re.findall(r"\d[\d,]*", budget_range or "")]
+    if not numbers:
+        return None
+    if len(numbers) == 1:
+        return (numbers[0], None)
+    return (min(numbers), max(numbers))
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+def trip_window(group_preferences_list):
+    """
+    Picks the dates everyone can make (latest start, earliest end).
+    Falls back to the widest window if the dates don't overlap.
+    Returns (start_date or None, number_of_days).
+    """
+    starts, ends = [], []
+    for p in group_preferences_list:
+        start_str, _, end_str = (p.get("dates") or "").partition(" to ")
+        start, end = _parse_date(start_str), _parse_date(end_str)
+        if start and end and end >= start:
+            starts.append(start)
+            ends.append(end)
+
+    if not starts:
+        return None, DEFAULT_TRIP_DAYS
+
+    start, end = max(starts), min(ends)
+    if end < start:
+        start, end = min(starts), max(ends)
+
+    days = (end - start).days + 1
+    return start, max(1, min(days, MAX_TRIP_DAYS))
+
+def _group_budget(group_preferences_list):
+    # The lowest upper bound in the group, so nobody gets priced out
+    highs = []
+    for p in group_preferences_list:
+        parsed = parse_budget(p.get("budget"))
+        if parsed and parsed[1] is not None:
+            highs.append(parsed[1])
+    return min(highs) if highs else None
+
+def _score(destination, tag_counts, budget, days, travel_km):
+    tag_score = sum(tag_counts.get(tag, 0) for tag in destination["tags"])
+    cost = destination["cost_per_day"] * days
+    over_budget = budget is not None and cost > budget
+    # Over-budget places are still allowed, just ranked below the ones that fit.
+    # Among equally good matches, the one closer to the group wins.
+    return (not over_budget, tag_score, -travel_km.get(destination["location"], 0), -cost, destination["location"])
+
+def _format_cost(amount):
+    return f"₹{amount:,} per person (approx.)"
+
+def _build_option(option_id, destination, tag_counts, days, start):
+    matched = [tag for tag in destination["tags"] if tag in tag_counts]
+    activities = destination["activities"]
+
+    itinerary = []
+    for day in range(1, days + 1):
+        activity = activities[(day - 1) % len(activities)]
+        if start:
+            date = start + datetime.timedelta(days=day - 1)
+            activity = f"{activity} ({date.strftime('%d %b')})"
+        itinerary.append({"day": day, "activity": activity})
+
+    city = destination["location"].split(",")[0]
+    return {
+        "id": option_id,
+        "title": f"{days} Days in {city}",
+        "location": destination["location"],
+        "total_estimated_cost": _format_cost(destination["cost_per_day"] * days),
+        "vibe_match": ", ".join(matched) if matched else ", ".join(destination["tags"][:2]),
+        "why_its_perfect": (
+            f"Matches the group's interest in {', '.join(matched)}." if matched
+            else "A well-rounded pick that works for most groups."
+        ),
+        "itinerary": itinerary
+    }
+
+def build_fallback_recommendations(group_preferences_list, origins=None):
+    """
+    Deterministic, offline version of get_trip_recommendations.
+    Ranks catalog destinations by how many of the group's tags they cover and
+    whether they fit the tightest budget (then by group travel distance when
+    `origins` are given), and returns two options in the same JSON schema the
+    AI produces.
+    """
+    catalog = load_catalog()
+
+    tag_counts = Counter()
+    for p in group_preferences_list:
+        tag_counts.update(p.get("tags") or [])
+
+    budget = _group_budget(group_preferences_list)
+    start, days = trip_window(group_preferences_list)
+
+    travel_km = {d["location"]: total for d, total, _ in geo.rank_destinations(origins, catalog) if total is not None}
+    ranked = sorted(catalog, key=lambda d: _score(d, tag_counts, budget, days, travel_km), reverse=True)
+
+    # Option 2 is the best destination that brings a different vibe from option 1
+    first = ranked[0]
+    second = next((d for d in ranked[1:] if set(d["tags"]) != set(first["tags"])), ranked[1])
+
+    top_tags = [tag for tag, _ in tag_counts.most_common(3)]
+    summary = f"Offline plan for {len(group_preferences_list)} traveller(s)"
+    if top_tags:
+        summary += f" who mostly want {', '.join(top_tags)}"
+    summary += ". Generated from our destination catalog while the AI planner is unavailable."
+
+    return {
+        "analysis_summary": summary,
+        "options": [
+            _build_option(1, first, tag_counts, days, start),
+            _build_option(2, second, tag_counts, days, start),
+        ]
+    }
@@ -1,24 +1,155 @@
-import google.generativeai as genai
 import os
+import threading
 import json
 import re
+import offline_planner
+import geo
+from circuit_breaker import CircuitBreaker, CircuitOpenError, HedgedCaller
 
-# Configure the API Key
-# Make sure your .env file or environment variable is set correctly
-# Or hardcode it temporarily for testing: genai.configure(api_key="YOUR_KEY_HERE")
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# The Gemini SDK is slow to import, so it is loaded on the first generation
+# request instead of at startup (keeps worker cold starts fast).
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                # Configure the API Key
+                # Make sure your .env file or environment variable is set correctly
+                # Or hardcode it temporarily for testing: genai.configure(api_key="YOUR_KEY_HERE")
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _genai = genai
+    return _genai
 
 # if not api_key or api_key == "AIzaSy_YOUR_REAL_API_KEY_HERE":
 #     print("⚠️ WARNING: You forgot to paste the actual API key!")
 # else:
 #     genai.configure(api_key=api_key) 
 
-def get_trip_recommendations(group_preferences_list):
-    print("DEBUG: Starting AI Generation...") # Debug print
+# --- Resilience Settings (override with env vars) ---
+# Calls slower than AI_SLOW_CALL_SECONDS count as failures; AI_FAILURE_THRESHOLD
+# failures in a row open the breaker for AI_RESET_SECONDS, during which we serve
+# the offline planner instead of waiting on Gemini.
+AI_FAILURE_THRESHOLD = int(os.getenv("AI_FAILURE_THRESHOLD", "3"))
+AI_SLOW_CALL_SECONDS = float(os.getenv("AI_SLOW_CALL_SECONDS", "20"))
+AI_RESET_SECONDS = float(os.getenv("AI_RESET_SECONDS", "30"))
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "30"))
+# Optional: send a second (hedged) request when the first is slower than the
+# recent p95. Off by default since a hedged call can double the Gemini spend.
+AI_HEDGING_ENABLED = os.getenv("AI_HEDGING_ENABLED", "0") == "1"
+
+breaker = CircuitBreaker(
+    failure_threshold=AI_FAILURE_THRESHOLD,
+    slow_call_seconds=AI_SLOW_CALL_SECONDS,
+    reset_timeout=AI_RESET_SECONDS,
+)
+hedger = HedgedCaller(timeout=AI_TIMEOUT_SECONDS)
+
+def gemini_provider(prompt):
+    """Default provider: sends the prompt to Gemini and returns the raw text."""
+    model = get_genai().GenerativeModel("gemini-2.5-flash")
+    response = model.generate_content(prompt, request_options={"timeout": AI_TIMEOUT_SECONDS})
+    return response.text
+
+def parse_ai_json(raw_text):
+    # FIX 2: Advanced Regex JSON Extraction
+    # This searches for the content between the first '{' and the last '}'
+    # It fixes issues where AI says "Here is the JSON: ```json ... ```"
+    json_match = re.search(r'\{.*\}', raw_text, re.DOTALL)
+    
+    if json_match:
+        clean_text = json_match.group(0)
+        return json.loads(clean_text)
+    else:
+        # Fallback if regex fails
+        clean_text = raw_text.replace("```json", "").replace("```", "").strip()
+        return json.loads(clean_text)
+
+def _generate(provider, prompt):
+    """One provider round trip, parsed. Raises on any failure (the breaker counts it)."""
+    raw_text = hedger.call(provider, prompt) if AI_HEDGING_ENABLED else provider(prompt)
+    try:
+        result = parse_ai_json(raw_text)
+        if not isinstance(result, dict) or not result.get("options"):
+            raise ValueError("AI response has no options")
+    except Exception:
+        print(f"Raw Response causing error: {raw_text}")
+        raise
+    return result
+
+# How many nearby catalog destinations to suggest to the model
+PROMPT_CANDIDATES = 6
+
+def nearby_candidates(group_preferences_list, origins, limit=PROMPT_CANDIDATES):
+    """
+    Catalog destinations that match at least one group tag, closest to the
+    group (by total travel distance) first.
+    """
+    if not origins:
+        return []
+    tags = {tag for p in group_preferences_list for tag in (p.get("tags") or [])}
+    catalog = offline_planner.load_catalog()
+    matching = [d for d in catalog if tags & set(d["tags"])] or catalog
+    return geo.rank_destinations(origins, matching)[:limit]
+
+# Options this many times farther (total group km) than the farthest nearby
+# candidate we suggested in the prompt get logged
+FAR_FROM_CANDIDATES_FACTOR = 1.5
+
+def add_travel_distances(result, origins, candidates=()):
+    """
+    Checks each option's location against the gazetteer. Every option gets
+    "location_verified" (False if we couldn't place it), and known places also
+    get how far the group would travel ("group_travel_km"). Unplaced options,
+    and ones far outside the nearby `candidates` sent in the prompt, are logged.
+    """
+    farthest_candidate = max((total for _, total, _ in candidates if total is not None), default=None)
+    for option in result.get("options", []):
+        if not isinstance(option, dict):
+            continue
+        location = option.get("location")
+        option["location_verified"] = geo.geocode(location) is not None
+        if not option["location_verified"]:
+            print(f"⚠️ Option location not in gazetteer: {location!r}")
+            continue
+
+        travel = geo.group_travel_km(origins, location)
+        if travel:
+            option["group_travel_km"] = travel
+            if farthest_candidate and travel["total"] > farthest_candidate * FAR_FROM_CANDIDATES_FACTOR:
+                print(f"⚠️ {location} is far from the suggested destinations: {travel['total']} km vs {farthest_candidate} km group total")
+    return result
+
+def get_trip_recommendations(group_preferences_list, provider=None):
+    """
+    Returns two itinerary options for the group.
+    `provider` is any callable prompt -> raw text (defaults to Gemini), so tests
+    can pass in a stub that is slow or raises.
+    If the provider fails, or the circuit breaker is open, the offline planner
+    answers instead so the user still gets a usable plan.
+    """
+    provider = provider or gemini_provider
+    origins = geo.group_origins(p.get("home_town") for p in group_preferences_list)
 
     # 1. Serialize Data
     prompt_data = json.dumps(group_preferences_list, indent=2)
 
+    # Nearby destinations that fit the group's tags, so the model doesn't pick
+    # somewhere half the group has to fly across the country for. Built before
+    # the breaker is involved, and only a hint: if it fails we go without it.
+    try:
+        candidates = nearby_candidates(group_preferences_list, origins)
+    except Exception as e:
+        print(f"⚠️ Could not rank nearby destinations: {e}")
+        candidates = []
+    distance_hints = "\n    ".join(
+        f"- {c['location']}: total group travel {total} km, farthest person {worst} km"
+        for c, total, worst in candidates
+    ) or "- (no hometowns could be located)"
+
     # 2. Advanced Prompt
     full_prompt = f"""
     SYSTEM INSTRUCTION:
@@ -60,42 +191,59 @@ def get_trip_recommendations(group_preferences_list):
 
     USER DATA:
     {prompt_data}
+
+    NEARBY CANDIDATE DESTINATIONS (closest to the group first):
+    {distance_hints}
+    Prefer these unless the group's preferences clearly need somewhere else.
     """
 
-    # FIX 1: Use the correct model name
-    model = genai.GenerativeModel("gemini-2.5-flash") 
-    
+    # 3. Call the AI through the circuit breaker (it records the outcome and
+    # latency of every attempt, and rejects instantly while open)
+    print("DEBUG: Starting AI Generation...") # Debug print
     try:
-        response = model.generate_content(full_prompt)
-        raw_text = response.text
-        
-        # FIX 2: Advanced Regex JSON Extraction
-        # This searches for the content between the first '{' and the last '}'
-        # It fixes issues where AI says "Here is the JSON: ```json ... ```"
-        json_match = re.search(r'\{.*\}', raw_text, re.DOTALL)
-        
-        if json_match:
-            clean_text = json_match.group(0)
-            return json.loads(clean_text)
-        else:
-            # Fallback if regex fails
-            clean_text = raw_text.replace("```json", "").replace("```", "").strip()
-            return json.loads(clean_text)
-
+        result = breaker.call(_generate, provider, full_prompt)
+    except CircuitOpenError:
+        print("⚡ AI circuit open, using offline planner")
+        result = offline_planner.build_fallback_recommendations(group_preferences_list, origins)
     except Exception as e:
         # FIX 3: Detailed Error Log
         print(f"❌ AI GENERATION ERROR: {e}")
-        # If possible, print the raw text to see what went wrong
-        try: print(f"Raw Response causing error: {response.text}")
-        except: pass
-        return None
+        result = offline_planner.build_fallback_recommendations(group_preferences_list, origins)
+
+    return add_travel_distances(result, origins, candidates)
     
-def smart_trip_chat(trip_data, participants, user_query):
+# Follow-ups that point at a day relative to the one we last talked about
+RELATIVE_DAY_PHRASES = {
+    "day after": 1, "next day": 1, "following day": 1, "tomorrow": 1,
+    "day before": -1, "previous day": -1, "that day": 0, "same day": 0,
+}
+
+def _last_mentioned_day(history):
+    # Walk back through the recent turns for the last "Day N"
+    for _, message in reversed(history or []):
+        found = re.findall(r"day\s*(\d+)", message.lower())
+        if found:
+            return int(found[-1])
+    return None
+
+def resolve_follow_up(query, history):
+    """Rewrites "and the day after?" into "day 3" using the conversation so far."""
+    if re.search(r"day\s*\d+", query):
+        return query
+    for phrase, offset in RELATIVE_DAY_PHRASES.items():
+        if phrase in query:
+            last_day = _last_mentioned_day(history)
+            if last_day is not None and last_day + offset >= 1:
+                return f"day {last_day + offset}"
+    return query
+
+def smart_trip_chat(trip_data, participants, user_query, history=None):
     """
     A local, context-aware chatbot that answers based on the Trip DB data.
     No API Keys required.
+    `history` is the recent [(role, message), ...] turns, used for follow-ups.
     """
-    query = user_query.lower()
+    query = resolve_follow_up(user_query.lower(), history)
     
     # Parse Itinerary if it's a string
     try:
@@ -116,7 +264,7 @@ def smart_trip_chat(trip_data, participants, user_query):
             d_val = str(day_plan.get("day", "")).lower()
             if d_val == str(day_num) or f"day {day_num}" in d_val:
                 
-                activities = day_plan.get("activities", [])
+                activities = day_plan.get("activities", day_plan.get("activity", []))
                 # Handle if activity is list or string
                 if isinstance(activities, list):
                     formatted_activities = "\n".join([f"- {act}" for act in activities])
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Literal
+from pydantic import BaseModel, EmailStr, StringConstraints, field_validator
+from typing import Annotated, Literal
 import datetime         
 
 # --- 1. Define Fixed Options (Enums) ---
@@ -124,4 +124,33 @@ class TripDetail(BaseModel):
 
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- Bulk Join Input (one row per participant) ---
+# Blank strings ("" or spaces, e.g. empty CSV cells) count as missing
+RequiredStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+class BulkParticipant(BaseModel):
+    email: RequiredStr # Plain str so one bad email doesn't reject the whole batch
+    home_town: RequiredStr
+    budget_range: RequiredStr
+    start_date: RequiredStr
+    end_date: RequiredStr
+    preference_tags: list[str] = []
+
+class TripBulkJoin(BaseModel):
+    trip_code: str
+    # Raw rows: each one is validated as a BulkParticipant separately, so a bad
+    # row is reported in the result instead of rejecting the whole request
+    participants: list
+
+class BulkJoinError(BaseModel):
+    row: int
+    email: str = ""
+    detail: str
+
+class BulkJoinResult(BaseModel):
+    status: str
+    trip_id: int
+    joined: int
+    errors: list[BulkJoinError] = []
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Points the app at fresh tables in a temp file instead of ./tripchalo.db."""
+    from sqlalchemy import create_engine
+    import database
+
+    original = database.engine
+    engine = create_engine(f"sqlite:///{tmp_path / 'tripchalo.db'}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "engine", engine)
+    database.SessionLocal.configure(bind=engine)
+    database.init_db()
+    yield engine
+    database.SessionLocal.configure(bind=original)
+    engine.dispose()
+
+@pytest.fixture
+def user_id(temp_db):
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user = models.User(
+            first_name="Asha", last_name="Rao", gender="Female", age=27, email="asha@example.com",
+            hashed_password="x", security_question="What is your favorite food?", hashed_security_answer="x",
+        )
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import admission
+import main
+import models
+from database import SessionLocal
+
+HEADER = "email,home_town,budget_range,start_date,end_date,preference_tags\n"
+
+@pytest.fixture
+def trip_code(user_id):
+    db = SessionLocal()
+    try:
+        for name in ("ravi", "meera", "kabir"):
+            db.add(models.User(
+                first_name=name.title(), last_name="K", gender="Other", age=25, email=f"{name}@example.com",
+                hashed_password="x", security_question="What is your favorite food?", hashed_security_answer="x",
+            ))
+        trip = models.Trip(trip_name="Goa", trip_code="GOA123", leader_id=user_id)
+        db.add(trip)
+        db.commit()
+        return trip.trip_code
+    finally:
+        db.close()
+
+@pytest.fixture
+def client():
+    admission.admission.reset()
+    return TestClient(main.app)
+
+def upload(client, user_id, trip_code, content):
+    return client.post(
+        f"/trips/bulk-join/csv?user_id={user_id}",
+        data={"trip_code": trip_code},
+        files={"file": ("people.csv", content, "text/csv")},
+    )
+
+def test_csv_reports_bad_rows_and_imports_the_rest(client, user_id, trip_code):
+    content = HEADER + (
+        "ravi@example.com,Mumbai,₹5,000 - ₹10,000,2026-12-01,2026-12-05,Beach;Food\n"
+        "meera@example.com,Pune,Low,2026-12-01,2026-12-05,Beach,\n"  # trailing comma: one extra cell
+        "kabir@example.com,,Low,2026-12-01,2026-12-05,\n"  # blank hometown
+        "nobody@example.com,Delhi,Low,2026-12-01,2026-12-05,\n"  # no such user
+        "kabir@example.com,Delhi,Low,2026-12-01\n"  # missing cells
+    )
+    # The first data row's budget contains commas, so quote it properly
+    content = content.replace("₹5,000 - ₹10,000", '"₹5,000 - ₹10,000"')
+
+    r = upload(client, user_id, trip_code, content.encode("utf-8"))
+
+    assert r.status_code == 200, r.text
+    result = r.json()
+    assert result["joined"] == 1
+    assert [(e["row"], e["email"]) for e in result["errors"]] == [
+        (3, "meera@example.com"), (4, "kabir@example.com"), (5, "nobody@example.com"), (6, "kabir@example.com"),
+    ]
+    assert "more cell" in result["errors"][0]["detail"]
+    assert result["errors"][1]["detail"] == "Invalid fields: home_town"
+
+    db = SessionLocal()
+    try:
+        assert db.query(models.TripParticipant).count() == 1
+    finally:
+        db.close()
+
+def test_csv_that_is_not_utf8_is_a_400(client, user_id, trip_code):
+    content = (HEADER + "ravi@example.com,Bhubaneswar,Low,2026-12-01,2026-12-05,Café\n").encode("latin-1")
+    r = upload(client, user_id, trip_code, content)
+    assert r.status_code == 400
+    assert "UTF-8" in r.json()["detail"]
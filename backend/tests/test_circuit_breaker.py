@@ -0,0 +1,102 @@
+import json
+import time
+
+import pytest
+
+import recommendation_service as rs
+from circuit_breaker import CircuitBreaker
+
+PREFS = [
+    {"age": 24, "gender": "Female", "home_town": "Pune", "budget": "₹5,000 - ₹10,000", "tags": ["Adventure", "Nature"], "dates": "2026-11-01 to 2026-11-04"},
+    {"age": 26, "gender": "Male", "home_town": "Delhi", "budget": "₹10,000 - ₹20,000", "tags": ["Culture"], "dates": "2026-11-02 to 2026-11-05"},
+]
+AI_PLAN = json.dumps({"analysis_summary": "From the AI", "options": [
+    {"id": 1, "title": "3 Days in Goa", "location": "Goa, India", "itinerary": []},
+    {"id": 2, "title": "3 Days in Manali", "location": "Manali, Himachal Pradesh, India", "itinerary": []},
+]})
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class StubProvider:
+    """Fault-injecting provider: raises, or 'takes' `delay` seconds on the fake clock."""
+
+    def __init__(self, clock, fail=False, delay=0.0):
+        self.clock, self.fail, self.delay = clock, fail, delay
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        self.clock.now += self.delay
+        if self.fail:
+            raise RuntimeError("Gemini is down")
+        return AI_PLAN
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, slow_call_seconds=20.0, reset_timeout=30.0, clock=clock)
+    monkeypatch.setattr(rs, "breaker", breaker)
+    monkeypatch.setattr(rs, "AI_HEDGING_ENABLED", False)
+    return clock
+
+def is_offline_plan(result):
+    return result["analysis_summary"].startswith("Offline plan") and [o["id"] for o in result["options"]] == [1, 2]
+
+def test_failing_provider_opens_the_breaker(clock):
+    provider = StubProvider(clock, fail=True)
+
+    for _ in range(3):
+        assert is_offline_plan(rs.get_trip_recommendations(PREFS, provider=provider))
+    assert provider.calls == 3
+    assert rs.breaker._state == CircuitBreaker.OPEN
+
+    # While open, the provider isn't called and the offline plan comes back right away
+    started = time.perf_counter()
+    result = rs.get_trip_recommendations(PREFS, provider=provider)
+    assert time.perf_counter() - started < 0.05
+    assert is_offline_plan(result)
+    assert provider.calls == 3
+
+def test_slow_provider_opens_the_breaker(clock):
+    provider = StubProvider(clock, delay=25.0) # answers, but slower than slow_call_seconds
+
+    for _ in range(3):
+        assert rs.get_trip_recommendations(PREFS, provider=provider)["analysis_summary"] == "From the AI"
+    assert rs.breaker._state == CircuitBreaker.OPEN
+
+    assert is_offline_plan(rs.get_trip_recommendations(PREFS, provider=provider))
+    assert provider.calls == 3
+
+def test_half_open_trial_success_closes_the_breaker(clock):
+    failing = StubProvider(clock, fail=True)
+    for _ in range(3):
+        rs.get_trip_recommendations(PREFS, provider=failing)
+    assert rs.breaker._state == CircuitBreaker.OPEN
+
+    clock.now += 30.0
+    healthy = StubProvider(clock)
+    result = rs.get_trip_recommendations(PREFS, provider=healthy)
+    assert result["analysis_summary"] == "From the AI"
+    assert healthy.calls == 1
+    assert rs.breaker._state == CircuitBreaker.CLOSED
+
+    rs.get_trip_recommendations(PREFS, provider=healthy)
+    assert healthy.calls == 2
+
+def test_half_open_trial_failure_opens_it_again(clock):
+    failing = StubProvider(clock, fail=True)
+    for _ in range(3):
+        rs.get_trip_recommendations(PREFS, provider=failing)
+
+    clock.now += 30.0
+    assert is_offline_plan(rs.get_trip_recommendations(PREFS, provider=failing))
+    assert failing.calls == 4
+    assert rs.breaker._state == CircuitBreaker.OPEN
+
+    assert is_offline_plan(rs.get_trip_recommendations(PREFS, provider=failing))
+    assert failing.calls == 4
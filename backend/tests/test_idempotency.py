@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+
+import admission
+import idempotency
+import main
+import models
+from database import SessionLocal
+
+def trip_payload(user_id):
+    return {
+        "user_id": user_id, "trip_name": "Goa with college friends", "home_town": "Pune",
+        "budget_range": "₹5,000 - ₹10,000", "start_date": "2026-12-01", "end_date": "2026-12-05",
+        "preference_tags": ["Beach"], "voting_days": 3,
+    }
+
+def count_rows():
+    db = SessionLocal()
+    try:
+        return db.query(models.Trip).count(), db.query(models.TripParticipant).count()
+    finally:
+        db.close()
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    idempotency.store.clear()
+    admission.admission.reset()
+    yield
+    idempotency.store.clear()
+
+async def post_creates(requests):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.post("/trips/create", json=body, headers=headers) for body, headers in requests))
+
+def test_concurrent_retries_create_one_trip(user_id):
+    request = (trip_payload(user_id), {"Idempotency-Key": "create-1"})
+    responses = asyncio.run(post_creates([request] * 10))
+
+    assert [r.status_code for r in responses] == [200] * 10
+    assert len({r.json()["trip_code"] for r in responses}) == 1
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 9
+    assert count_rows() == (1, 1)
+
+def test_reused_key_with_different_body_is_rejected(user_id):
+    headers = {"Idempotency-Key": "create-2"}
+    other = dict(trip_payload(user_id), trip_name="Something else")
+    first = asyncio.run(post_creates([(trip_payload(user_id), headers)]))[0]
+    second = asyncio.run(post_creates([(other, headers)]))[0]
+
+    assert first.status_code == 200
+    assert second.status_code == 422
+    assert count_rows() == (1, 1)
+
+def test_rate_limited_response_is_not_replayed(user_id, monkeypatch):
+    now = [0.0]
+    classes = dict(admission.COST_CLASSES, write=admission.CostClass(rate=1.0, burst=1, max_concurrent=4, queue_timeout=0.0))
+    monkeypatch.setattr(admission, "admission", admission.AdmissionController(classes, clock=lambda: now[0]))
+    headers = {"Idempotency-Key": "create-3"}
+
+    # The one token goes to an unrelated request, so the keyed one is rate limited
+    assert asyncio.run(post_creates([(trip_payload(user_id), {})]))[0].status_code == 200
+    limited = asyncio.run(post_creates([(trip_payload(user_id), headers)]))[0]
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    assert count_rows() == (1, 1)
+
+    # After the bucket refills, the retry with the same key actually runs
+    now[0] += 1.0
+    retried = asyncio.run(post_creates([(trip_payload(user_id), headers)]))[0]
+    assert retried.status_code == 200
+    assert "idempotent-replayed" not in retried.headers
+    assert count_rows() == (2, 2)
+
+    # ...and from then on that success is what gets replayed
+    now[0] += 1.0
+    replayed = asyncio.run(post_creates([(trip_payload(user_id), headers)]))[0]
+    assert replayed.headers.get("idempotent-replayed") == "true"
+    assert replayed.json()["trip_code"] == retried.json()["trip_code"]
+    assert count_rows() == (2, 2)
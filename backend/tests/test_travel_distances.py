@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import recommendation_service as rs
+from circuit_breaker import CircuitBreaker
+
+PREFS = [
+    {"home_town": "Pune", "budget": "₹10,000 - ₹20,000", "tags": ["Beach"], "dates": "2026-11-01 to 2026-11-04"},
+    {"home_town": "bombay", "budget": "₹10,000 - ₹20,000", "tags": ["Beach"], "dates": "2026-11-01 to 2026-11-04"},
+]
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch):
+    monkeypatch.setattr(rs, "breaker", CircuitBreaker())
+    monkeypatch.setattr(rs, "AI_HEDGING_ENABLED", False)
+
+def plan(*locations):
+    options = [{"id": i, "title": f"Option {i}", "location": loc, "itinerary": []} for i, loc in enumerate(locations, start=1)]
+    return lambda prompt: json.dumps({"analysis_summary": "From the AI", "options": options})
+
+def test_known_locations_are_verified_with_distances(capsys):
+    result = rs.get_trip_recommendations(PREFS, provider=plan("Goa, India", "Hampi, Karnataka, India"))
+
+    for option in result["options"]:
+        assert option["location_verified"] is True
+        assert option["group_travel_km"]["total"] > 0
+    assert "⚠️" not in capsys.readouterr().out
+
+def test_unknown_and_far_locations_are_flagged(capsys):
+    result = rs.get_trip_recommendations(PREFS, provider=plan("Atlantis", "Port Blair, Andaman and Nicobar Islands"))
+    unknown, far = result["options"]
+
+    assert unknown["location_verified"] is False
+    assert "group_travel_km" not in unknown
+    assert far["location_verified"] is True
+    assert far["group_travel_km"]["total"] > 4000
+
+    out = capsys.readouterr().out
+    assert "not in gazetteer: 'Atlantis'" in out
+    assert "Port Blair, Andaman and Nicobar Islands is far from the suggested destinations" in out
+
+def test_offline_plan_locations_are_verified():
+    rs.breaker.failure_threshold = 1
+    def down(prompt):
+        raise RuntimeError("Gemini is down")
+
+    result = rs.get_trip_recommendations(PREFS, provider=down)
+    assert result["analysis_summary"].startswith("Offline plan")
+    assert all(option["location_verified"] for option in result["options"])
@@ -1,4 +1,5 @@
 import bcrypt
+import orjson
 
 def hash_password(password: str) -> str:
     """
@@ -24,4 +25,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return bcrypt.checkpw(plain_bytes, hashed_bytes)
     except Exception as e:
         print(f"Hashing Error: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def chosen_option(itinerary_data, option_id):
+    """
+    The option the group picked, out of a trip's stored itinerary JSON.
+    Returns None if nothing is chosen yet or the stored JSON doesn't have it.
+    Chat, export and analytics all use this, so they agree on what was chosen.
+    """
+    if not itinerary_data or not option_id:
+        return None
+    try:
+        all_data = orjson.loads(itinerary_data)
+        return next((opt for opt in all_data.get("options", []) if opt.get("id") == option_id), None)
+    except (orjson.JSONDecodeError, AttributeError, TypeError):
+        return None